@@ -0,0 +1,140 @@
+"""
+Single-process server hosting all five Lambda handlers.
+
+For on-prem and dev deployments: every route calls the same lambda_handler the
+Lambdas run, but inside one process that shares a single Chroma collection, one
+pooled Gemini HTTP session, the in-memory Gemini scheduler and the shared caches.
+The extract -> embedding Lambda invoke hop becomes a direct in-process call.
+Handlers run on a worker thread pool, so the event loop keeps accepting
+requests while a slow Gemini call or OCR job is in flight.
+
+S3 stays the document store; point AWS_ENDPOINT_URL at MinIO or another
+S3-compatible service to run without AWS.
+
+    uvicorn local_api:app --host 0.0.0.0 --port 8000
+"""
+import json
+import os
+import shutil
+import sys
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import anyio
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "src", "shared"))
+
+# Configuration the handler modules read at import time
+os.environ.setdefault("CHROMA_PATH", os.path.join(BACKEND_DIR, "chromadb_local"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.pop("EMBEDDING_LAMBDA_NAME", None)
+
+import chromadb
+import lexical_index
+from instrumentation import span
+from src.embedding_handler import embedding_handler
+from src.extract_loader import extract_loader
+from src.query_handler import query_handler
+from src.summarizer_handler import summarizer
+from src.upload_handler import app as upload_handler
+
+WORKER_THREADS = int(os.environ.get("LOCAL_API_WORKER_THREADS", "64"))
+ALLOWED_ORIGINS = os.environ.get("ALLOWED_ORIGINS", "*").split(",")
+
+# One vector store and one set of lexical indexes for every handler
+chroma_client = chromadb.PersistentClient(path=os.environ["CHROMA_PATH"])
+collection = chroma_client.get_or_create_collection(name="documents")
+lexical_store = lexical_index.LexicalIndexStore(os.path.join(os.environ["CHROMA_PATH"], "lexical"))
+for _module in (embedding_handler, query_handler, summarizer):
+    _module.collection = collection
+for _module in (embedding_handler, query_handler):
+    _module.lexical_store = lexical_store
+
+
+def embed_in_process(bucket, text_key, file_key):
+    """Replaces extract_loader's lambda_client.invoke with a direct call inside the same trace"""
+    with span("embedding_inline"):
+        embedding_handler.lambda_handler.__wrapped__(
+            {"bucket": bucket, "text_key": text_key, "file_key": file_key}, None
+        )
+
+
+extract_loader.trigger_embedding = embed_in_process
+
+# The Lambda layer's tesseract path doesn't exist outside Lambda
+_tesseract = os.environ.get("TESSERACT_CMD") or shutil.which("tesseract")
+if _tesseract:
+    extract_loader.pytesseract.pytesseract.tesseract_cmd = _tesseract
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Handlers are blocking; size the pool they run on for the expected concurrency
+    anyio.to_thread.current_default_thread_limiter().total_tokens = WORKER_THREADS
+    yield
+
+
+app = FastAPI(title="Anvita AI local API", lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=ALLOWED_ORIGINS, allow_methods=["*"], allow_headers=["*"])
+
+
+async def to_api_gateway_event(request):
+    """The subset of an API Gateway proxy event the handlers read"""
+    body = await request.body()
+    return {
+        "httpMethod": request.method,
+        "path": request.url.path,
+        "headers": dict(request.headers),
+        "queryStringParameters": dict(request.query_params) or None,
+        "body": body.decode("utf-8") if body else None
+    }
+
+
+async def invoke(handler, event):
+    context = SimpleNamespace(aws_request_id=str(uuid.uuid4()))
+    result = await anyio.to_thread.run_sync(handler, event, context)
+    headers = {"Content-Type": "application/json", **(result.get("headers") or {})}
+    return Response(content=result.get("body") or "", status_code=result["statusCode"], headers=headers)
+
+
+@app.post("/generate-upload-url")
+async def generate_upload_url(request: Request):
+    return await invoke(upload_handler.lambda_handler, await to_api_gateway_event(request))
+
+
+@app.post("/extract")
+async def extract(request: Request):
+    return await invoke(extract_loader.lambda_handler, await to_api_gateway_event(request))
+
+
+@app.post("/embed")
+async def embed(request: Request):
+    # The embedding Lambda is invoked with the payload itself rather than a proxy event
+    event = await to_api_gateway_event(request)
+    try:
+        payload = json.loads(event["body"] or "{}")
+    except ValueError:
+        return Response(json.dumps({"error": "Invalid JSON body"}), status_code=400, media_type="application/json")
+    payload.update({k: v for k, v in event.items() if k in ("headers", "queryStringParameters")})
+    return await invoke(embedding_handler.lambda_handler, payload)
+
+
+@app.post("/qa")
+async def qa(request: Request):
+    return await invoke(query_handler.lambda_handler, await to_api_gateway_event(request))
+
+
+@app.api_route("/summarize", methods=["GET", "POST"])
+async def summarize(request: Request):
+    return await invoke(summarizer.lambda_handler, await to_api_gateway_event(request))
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "chunks": await anyio.to_thread.run_sync(collection.count)}
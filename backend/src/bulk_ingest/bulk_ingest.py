@@ -0,0 +1,254 @@
+"""
+Bulk ingestion of a whole S3 prefix.
+
+Lists every supported document under a prefix, extracts and embeds them across a
+process pool using the same code as the extract/embedding Lambdas, and stores the
+vectors in ChromaDB from the parent process, the only one that opens the store.
+Progress is appended to a JSON-lines checkpoint, so a crashed or interrupted run
+resumes where it stopped. Objects that are already ingested (in the checkpoint
+with the same ETag, or already present in ChromaDB) are skipped.
+
+Embedding calls go through the Gemini scheduler's background lane. Set
+GEMINI_SCHEDULER_TABLE so the pool shares its quota with the deployed handlers;
+otherwise each worker process gets in-memory buckets holding an equal share of
+GEMINI_RPM/GEMINI_TPM.
+
+Usage:
+    python src/bulk_ingest/bulk_ingest.py --bucket anvita-s3-bucket --prefix uploads/customer-a/ --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _module_dir in ("shared", "extract_loader", "embedding_handler"):
+    sys.path.append(os.path.join(SRC_DIR, _module_dir))
+
+# Spawned workers re-import this module, so nothing imported here may open ChromaDB
+import extract_loader
+import gemini_embeddings
+import gemini_scheduler
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
+
+
+class Checkpoint:
+    """Append-only JSON-lines log of finished objects: {"file_key", "etag", "status", ...}"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A crash can leave a torn last line behind
+                        continue
+                    self.entries[entry["file_key"]] = entry
+        self._file = open(path, "a")
+
+    def is_done(self, file_key, etag):
+        entry = self.entries.get(file_key)
+        return bool(entry) and entry["status"] in ("ingested", "existing") and entry.get("etag") == etag
+
+    def record(self, entry):
+        self.entries[entry["file_key"]] = entry
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def list_objects(bucket, prefix):
+    """Yields (file_key, etag, size) for every supported document under the prefix"""
+    paginator = extract_loader.s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if os.path.splitext(key)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield key, obj.get("ETag", "").strip('"'), obj.get("Size", 0)
+
+
+def plan_object(checkpoint, file_key, etag, reingest=False):
+    """
+    "skip" when the latest checkpoint entry is this ETag ingested. "replace" when
+    the checkpoint has any other history for the key (an older version, or a
+    failed attempt that may have followed one), so stale chunks are deleted
+    first. Otherwise "new".
+    """
+    if reingest:
+        return "replace"
+    if checkpoint.is_done(file_key, etag):
+        return "skip"
+    if file_key in checkpoint.entries:
+        return "replace"
+    return "new"
+
+
+def _storage():
+    """embedding_handler opens the Chroma store at import time; only the parent calls this"""
+    import embedding_handler
+    return embedding_handler
+
+
+def already_in_chroma(file_key):
+    return bool(_storage().collection.get(where={"file_key": file_key}, limit=1)["ids"])
+
+
+def _init_worker(tesseract_cmd, workers):
+    if not gemini_scheduler.SCHEDULER_TABLE:
+        # No shared bucket: split the quota so the pool as a whole stays within it
+        gemini_scheduler.set_scheduler(gemini_scheduler.GeminiScheduler(
+            gemini_scheduler.InMemoryStore(),
+            requests_per_min=gemini_scheduler.GEMINI_RPM / workers,
+            tokens_per_min=gemini_scheduler.GEMINI_TPM / workers
+        ))
+    if tesseract_cmd:
+        extract_loader.pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def process_object(bucket, file_key):
+    """
+    Runs in a pool worker: extract text (writing texts/ like the /extract Lambda),
+    then chunk and embed it. Storage happens in the parent, which owns the Chroma client.
+    """
+    started = time.perf_counter()
+    text_key, text = extract_loader.extract_and_store_text(bucket, file_key)
+    chunks, embeddings = gemini_embeddings.embed_document(text)
+    return {
+        "text_key": text_key,
+        "chunks": chunks,
+        "embeddings": embeddings,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def _rate(n, seconds):
+    return round(n / seconds, 2) if seconds else 0.0
+
+
+def run(bucket, prefix, workers, checkpoint_path, reingest=False, limit=None, max_in_flight=None,
+        tesseract_cmd=None, progress_every=25):
+    storage = _storage()
+    checkpoint = Checkpoint(checkpoint_path)
+    stats = {"listed": 0, "ingested": 0, "skipped": 0, "failed": 0, "chunks": 0, "bytes": 0}
+    max_in_flight = max_in_flight or workers * 2
+    started = time.perf_counter()
+
+    def report(final=False):
+        elapsed = time.perf_counter() - started
+        print(json.dumps(dict(
+            stats,
+            elapsed_s=round(elapsed, 1),
+            docs_per_s=_rate(stats["ingested"], elapsed),
+            chunks_per_s=_rate(stats["chunks"], elapsed),
+            final=final
+        )))
+
+    def pending_objects():
+        for file_key, etag, size in list_objects(bucket, prefix):
+            stats["listed"] += 1
+            action = plan_object(checkpoint, file_key, etag, reingest)
+            if action == "skip":
+                stats["skipped"] += 1
+                continue
+            if action == "new" and already_in_chroma(file_key):
+                stats["skipped"] += 1
+                checkpoint.record({"file_key": file_key, "etag": etag, "status": "existing"})
+                continue
+            yield file_key, etag, size, action == "replace"
+
+    if not gemini_scheduler.SCHEDULER_TABLE:
+        print(f"GEMINI_SCHEDULER_TABLE not set; each of the {workers} workers gets 1/{workers} of the Gemini quota")
+
+    context = multiprocessing.get_context("spawn")
+    in_flight = {}
+    submitted = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(tesseract_cmd, workers)) as pool:
+            objects = pending_objects()
+            while True:
+                # Keep a bounded window of work queued so listing stays lazy
+                while len(in_flight) < max_in_flight and (limit is None or submitted < limit):
+                    item = next(objects, None)
+                    if item is None:
+                        break
+                    in_flight[pool.submit(process_object, bucket, item[0])] = item
+                    submitted += 1
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_key, etag, size, replace = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                        if replace:
+                            storage.collection.delete(where={"file_key": file_key})
+                        doc_id = str(uuid.uuid4())
+                        stored = storage.store_chunks(
+                            file_key, doc_id, result["chunks"], result["embeddings"]
+                        )
+                    except Exception as e:
+                        stats["failed"] += 1
+                        checkpoint.record({"file_key": file_key, "etag": etag, "status": "failed", "error": str(e)})
+                        continue
+
+                    stats["ingested"] += 1
+                    stats["chunks"] += stored
+                    stats["bytes"] += size
+                    checkpoint.record({
+                        "file_key": file_key,
+                        "etag": etag,
+                        "status": "ingested",
+                        "doc_id": doc_id,
+                        "text_key": result["text_key"],
+                        "chunks": stored,
+                        "seconds": result["seconds"]
+                    })
+                    if stats["ingested"] % progress_every == 0:
+                        report()
+    finally:
+        checkpoint.close()
+
+    report(final=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest every document under an S3 prefix")
+    parser.add_argument("--bucket", default=os.environ.get("BUCKET_NAME"))
+    parser.add_argument("--prefix", default="uploads/")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: derived from bucket and prefix)")
+    parser.add_argument("--reingest", action="store_true", help="Replace documents that are already ingested")
+    parser.add_argument("--limit", type=int, help="Stop after submitting this many documents")
+    parser.add_argument("--tesseract", help="Path to the tesseract binary when not using the Lambda layer path")
+    parser.add_argument("--progress-every", type=int, default=25)
+    args = parser.parse_args()
+
+    if not args.bucket:
+        raise SystemExit("Missing --bucket (or BUCKET_NAME)")
+
+    checkpoint = args.checkpoint or "bulk_ingest_{}_{}.checkpoint.jsonl".format(
+        args.bucket, args.prefix.strip("/").replace("/", "_") or "root"
+    )
+    run(
+        args.bucket, args.prefix, args.workers, checkpoint,
+        reingest=args.reingest, limit=args.limit, tesseract_cmd=args.tesseract,
+        progress_every=args.progress_every
+    )
+
+
+if __name__ == "__main__":
+    main()
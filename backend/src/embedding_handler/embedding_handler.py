@@ -1,58 +1,62 @@
 import boto3
 import json
 import os
+import sys
 import uuid
 import chromadb
-import requests
 import math
 
+try:
+    from instrumentation import instrumented, span, count
+    from gemini_embeddings import embed_document
+    import lexical_index
+except ImportError:
+    # Running outside Lambda, where the shared layer isn't mounted
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+    from instrumentation import instrumented, span, count
+    from gemini_embeddings import embed_document
+    import lexical_index
+
 s3 = boto3.client('s3')
 BUCKET_NAME = os.environ.get('BUCKET_NAME')
 
 # ChromaDB persistent storage in Lambda's /tmp
-CHROMA_PATH = "/tmp/chromadb"
+CHROMA_PATH = os.environ.get("CHROMA_PATH", "/tmp/chromadb")
 chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
 collection = chroma_client.get_or_create_collection(name="documents")
+# BM25 inverted indexes, one per document, stored next to the vectors
+lexical_store = lexical_index.LexicalIndexStore(os.path.join(CHROMA_PATH, "lexical"))
 
-# Gemini API setup
-GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-GEMINI_EMBED_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-embedding-001:embedContent"
-
-def chunk_text_by_tokens(text, max_tokens=1800):
-    """
-    Splits text into chunks that are under the token limit.
-    Roughly assumes 1 token ~ 4 characters.
-    """
-    max_chars = max_tokens * 4
-    return [text[i:i+max_chars] for i in range(0, len(text), max_chars)]
+def load_text(bucket, text_key):
+    """Reads an extracted text object written by extract_loader"""
+    with span("s3_download"):
+        obj = s3.get_object(Bucket=bucket, Key=text_key)
+        raw = obj["Body"].read()
+    count("s3_download_bytes", len(raw), "Bytes")
+    return raw.decode('utf-8')
 
-def get_embedding(text):
+def store_chunks(file_key, doc_id, chunks, embeddings):
     """
-    Calls Gemini's embedContent for a single chunk.
-    Returns the embedding vector.
+    Adds a document's chunks to ChromaDB in one call and writes its lexical index.
+    Returns the number of chunks stored.
     """
-    try:
-        payload = {
-            "model": "models/gemini-embedding-001",
-            "content": {"parts": [{"text": text}]}
-        }
-
-        response = requests.post(
-            GEMINI_EMBED_URL,
-            headers={
-                "x-goog-api-key": GEMINI_API_KEY,
-                "Content-Type": "application/json"
-            },
-            json=payload
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        return data["embedding"]["values"] 
-
-    except Exception as e:
-        raise RuntimeError(f"Gemini embedding API failed: {str(e)}")
+    if chunks:
+        with span("chroma_add"):
+            collection.add(
+                ids=[f"{doc_id}_{i}" for i in range(len(chunks))],
+                documents=chunks,
+                embeddings=embeddings,
+                metadatas=[
+                    {"file_key": file_key, "chunk_id": i, "doc_id": doc_id}
+                    for i in range(len(chunks))
+                ]
+            )
+        with span("lexical_index_build"):
+            lexical_store.save(file_key, lexical_index.build_index(doc_id, chunks))
+    count("chunks_ingested", len(chunks))
+    return len(chunks)
 
+@instrumented("embedding_handler")
 def lambda_handler(event, context):
     try:
         # record = event['Records'][0]
@@ -65,28 +69,9 @@ def lambda_handler(event, context):
         file_key = event["file_key"]
         doc_id = str(uuid.uuid4())
 
-        obj = s3.get_object(Bucket=bucket, Key=text_key)
-        extracted_text = obj["Body"].read().decode('utf-8')
-
-        # Token-safe chunking
-        chunks = chunk_text_by_tokens(extracted_text, max_tokens=1800)
-
-        # Sequentially embed each chunk
-        chunks_ingested = 0
-        for i, chunk in enumerate(chunks):
-            embedding = get_embedding(chunk)
-            metadata = {
-                "file_key": file_key,
-                "chunk_id": i,
-                "doc_id": doc_id
-            }
-            collection.add(
-                ids=[f"{doc_id}_{i}"],
-                documents=[chunk],
-                embeddings=[embedding],
-                metadatas=[metadata]
-            )
-            chunks_ingested += 1
+        extracted_text = load_text(bucket, text_key)
+        chunks, embeddings = embed_document(extracted_text)
+        chunks_ingested = store_chunks(file_key, doc_id, chunks, embeddings)
 
         return {
             "statusCode": 200,
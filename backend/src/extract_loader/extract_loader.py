@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import boto3
 import tempfile
@@ -8,6 +9,13 @@ import pytesseract
 from PIL import Image
 import docx
 
+try:
+    from instrumentation import instrumented, span, count
+except ImportError:
+    # Running outside Lambda, where the shared layer isn't mounted
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+    from instrumentation import instrumented, span, count
+
 # Set Tesseract binary path for Lambda Layer
 pytesseract.pytesseract.tesseract_cmd = "/opt/bin/tesseract"
 # pytesseract.pytesseract.tesseract_cmd = "path to your tesseract exe in your machine"
@@ -18,35 +26,48 @@ lambda_client = boto3.client('lambda')
 EMBEDDING_LAMBDA = os.environ.get("EMBEDDING_LAMBDA_NAME")
 
 def extract_text_from_file(bucket, file_key):
+    return extract_and_store_text(bucket, file_key)[0]
+
+def extract_and_store_text(bucket, file_key):
+    """
+    Extracts the document's text and writes it under texts/.
+    Returns (text_key, text), so callers that embed right away skip reading it back.
+    """
     ext = os.path.splitext(file_key)[1].lower()
     text_key = file_key.replace('uploads/', 'texts/').rsplit('.', 1)[0] + '.txt'
     text = ""
 
     with tempfile.NamedTemporaryFile(suffix=ext) as tmp_file:
-        s3.download_fileobj(bucket, file_key, tmp_file)
+        with span("s3_download"):
+            s3.download_fileobj(bucket, file_key, tmp_file)
+        count("s3_download_bytes", tmp_file.tell(), "Bytes")
         tmp_file.seek(0)
 
         if ext == '.pdf':
             try:
-                reader = PdfReader(tmp_file.name)
-                text = "\n".join(page.extract_text() or "" for page in reader.pages)
+                with span("pdf_parse"):
+                    reader = PdfReader(tmp_file.name)
+                    text = "\n".join(page.extract_text() or "" for page in reader.pages)
+                count("pages_parsed", len(reader.pages))
 
                 if not text.strip():
                     text_parts = []
                     pdf_doc = fitz.open(tmp_file.name)
                     for page_num in range(len(pdf_doc)):
-                        page = pdf_doc[page_num]
-                        pix = page.get_pixmap()
-                        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                        text_parts.append(pytesseract.image_to_string(img))
+                        with span("ocr_page"):
+                            page = pdf_doc[page_num]
+                            pix = page.get_pixmap()
+                            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                            text_parts.append(pytesseract.image_to_string(img))
                     text = "\n".join(text_parts) or "[No text found in scanned PDF]"
             except Exception as e:
                 text = f"[Error extracting text from PDF: {str(e)}]"
 
         elif ext == '.docx':
             try:
-                doc = docx.Document(tmp_file.name)
-                text = '\n'.join([para.text for para in doc.paragraphs])
+                with span("docx_parse"):
+                    doc = docx.Document(tmp_file.name)
+                    text = '\n'.join([para.text for para in doc.paragraphs])
             except Exception as e:
                 text = f"[Error extracting text from DOCX: {str(e)}]"
 
@@ -59,16 +80,36 @@ def extract_text_from_file(bucket, file_key):
         else:
             text = "[Unsupported file type]"
 
-    s3.put_object(
-        Bucket=bucket,
-        Key=text_key,
-        Body=text,
-        ContentType='text/plain'
-    )
-
-    return text_key
+    count("text_bytes", len(text.encode('utf-8')), "Bytes")
+    with span("s3_upload"):
+        s3.put_object(
+            Bucket=bucket,
+            Key=text_key,
+            Body=text,
+            ContentType='text/plain'
+        )
+
+    return text_key, text
+
+
+def trigger_embedding(bucket, text_key, file_key):
+    """Hands the extracted text to the embedding Lambda (the local server swaps in a direct call)"""
+    if not EMBEDDING_LAMBDA:
+        return
+    with span("embedding_invoke"):
+        lambda_client.invoke(
+            FunctionName=EMBEDDING_LAMBDA,
+            # InvocationType="Event",
+            InvocationType="RequestResponse",
+            Payload=json.dumps({
+                "bucket": bucket,
+                "text_key": text_key,
+                "file_key": file_key
+            })
+        )
 
 
+@instrumented("extract_loader")
 def lambda_handler(event, context):
     """Lambda handler triggered when files are uploaded to S3"""
     try:
@@ -84,17 +125,7 @@ def lambda_handler(event, context):
         
         text_key = extract_text_from_file(bucket, file_key)
 
-        if EMBEDDING_LAMBDA:
-            lambda_client.invoke(
-                FunctionName=EMBEDDING_LAMBDA,
-                # InvocationType="Event",
-                InvocationType="RequestResponse",
-                Payload=json.dumps({
-                    "bucket": bucket,
-                    "text_key": text_key,
-                    "file_key": file_key
-                })
-            )
+        trigger_embedding(bucket, text_key, file_key)
         
         return {
             "statusCode": 200,
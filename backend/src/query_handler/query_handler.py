@@ -1,21 +1,53 @@
 import boto3
 import json
 import os
-import requests
+import sys
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 import chromadb
 
+try:
+    from instrumentation import instrumented, span, count, record_token_usage
+    import caches
+    import gemini_client
+    import gemini_scheduler
+    import lexical_index
+except ImportError:
+    # Running outside Lambda, where the shared layer isn't mounted
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+    from instrumentation import instrumented, span, count, record_token_usage
+    import caches
+    import gemini_client
+    import gemini_scheduler
+    import lexical_index
+
 # ChromaDB
-CHROMA_PATH = "/tmp/chromadb"
+CHROMA_PATH = os.environ.get("CHROMA_PATH", "/tmp/chromadb")
 chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
 collection = chroma_client.get_or_create_collection(name="documents")
+lexical_store = lexical_index.LexicalIndexStore(os.path.join(CHROMA_PATH, "lexical"))
+
+# Hybrid retrieval: BM25 and vector results merged with reciprocal rank fusion
+RETRIEVAL_K = 5
+# Skip the question embedding when an exact identifier lookup is unambiguous
+LEXICAL_FAST_PATH = os.environ.get("LEXICAL_FAST_PATH", "false").lower() == "true"
+LEXICAL_FAST_PATH_MIN_MARGIN = float(os.environ.get("LEXICAL_FAST_PATH_MIN_MARGIN", "1.5"))
+retrieval_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("RETRIEVAL_THREADS", "8")))
 
 # Google Gemini setup
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 GEMINI_EMBED_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-embedding-001:embedContent"
 GEMINI_FLASH_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+# Answer length reserved against the tokens/min quota before generation
+QA_OUTPUT_TOKEN_ESTIMATE = 512
 
 def get_embedding_gemini(text: str) -> list[float]:
     """Generate an embedding using Gemini embedding API"""
+    # Repeated questions skip the embedding round trip
+    cached = caches.question_embeddings.get(text)
+    if cached is not None:
+        return cached
+
     try:
         payload = {
             "model": "models/gemini-embedding-001",
@@ -24,16 +56,21 @@ def get_embedding_gemini(text: str) -> list[float]:
             }
         }
 
-        response = requests.post(
-            f"{GEMINI_EMBED_URL}?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json=payload
-        )
-        response.raise_for_status()
+        gemini_scheduler.acquire(gemini_scheduler.INTERACTIVE, gemini_scheduler.estimate_tokens(text))
+        with span("embed_query"):
+            response = gemini_client.post(
+                f"{GEMINI_EMBED_URL}?key={GEMINI_API_KEY}",
+                headers={"Content-Type": "application/json"},
+                json=payload
+            )
+            response.raise_for_status()
+        count("embed_tokens_estimated", len(text) // 4)
         data = response.json()
 
         # Gemini returns embedding under embedding.values
-        return data["embedding"]["values"]
+        embedding = data["embedding"]["values"]
+        caches.question_embeddings.put(text, embedding)
+        return embedding
 
     except Exception as e:
         raise RuntimeError(f"Gemini embedding API failed: {str(e)}")
@@ -58,13 +95,18 @@ Question:
             }]
         }
 
-        response = requests.post(
-            f"{GEMINI_FLASH_URL}?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json=payload
+        gemini_scheduler.acquire(
+            gemini_scheduler.INTERACTIVE, gemini_scheduler.estimate_tokens(prompt) + QA_OUTPUT_TOKEN_ESTIMATE
         )
-        response.raise_for_status()
+        with span("llm_generate"):
+            response = gemini_client.post(
+                f"{GEMINI_FLASH_URL}?key={GEMINI_API_KEY}",
+                headers={"Content-Type": "application/json"},
+                json=payload
+            )
+            response.raise_for_status()
         data = response.json()
+        record_token_usage(data)
 
         # Extract answer text
         return data["candidates"][0]["content"]["parts"][0]["text"]
@@ -72,6 +114,74 @@ Question:
     except Exception as e:
         raise RuntimeError(f"Gemini QA API failed: {str(e)}")
 
+def vector_search(file_key, question):
+    """Ranked chunk ids from the question embedding, plus the chunks it returned"""
+    question_embedding = get_embedding_gemini(question)
+    with span("chroma_query"):
+        results = collection.query(
+            query_embeddings=[question_embedding],
+            n_results=RETRIEVAL_K,
+            where={"file_key": file_key}
+        )
+    ids = results.get('ids', [[]])[0]
+    documents = results.get('documents', [[]])[0]
+    metadatas = results.get('metadatas', [[]])[0]
+    return ids, dict(zip(ids, zip(documents, metadatas)))
+
+def lexical_search(index, question):
+    with span("lexical_search"):
+        hits = lexical_index.search(index, question, k=RETRIEVAL_K)
+    return [f"{index['doc_id']}_{chunk_id}" for chunk_id, _ in hits], hits
+
+def fetch_chunks(ids):
+    """Chunk text and metadata for lexical hits, which the vector query didn't return"""
+    with span("chroma_get"):
+        results = collection.get(ids=ids)
+    return dict(zip(results["ids"], zip(results["documents"], results["metadatas"])))
+
+def _in_order(ids, chunks):
+    found = [i for i in ids if i in chunks]
+    return [chunks[i][0] for i in found], [chunks[i][1] for i in found]
+
+def retrieve(file_key, question):
+    """
+    Returns (documents, metadatas, mode) for the best RETRIEVAL_K chunks.
+    Lexical and vector search run concurrently and are fused; documents ingested
+    before lexical indexing fall back to vector search alone, and a failed vector
+    search falls back to the lexical ranking when it found anything.
+    """
+    index = lexical_store.load(file_key)
+    lexical_ids = []
+    if index and LEXICAL_FAST_PATH:
+        lexical_ids, hits = lexical_search(index, question)
+        if lexical_index.is_confident(index, question, hits, LEXICAL_FAST_PATH_MIN_MARGIN):
+            count("lexical_fast_path")
+            return (*_in_order(lexical_ids, fetch_chunks(lexical_ids)), "lexical")
+
+    # The vector path (embedding round trip + Chroma query) runs on the pool inside this trace
+    vector_future = retrieval_pool.submit(contextvars.copy_context().run, vector_search, file_key, question)
+    if index and not LEXICAL_FAST_PATH:
+        lexical_ids, _ = lexical_search(index, question)
+    try:
+        vector_ids, chunks = vector_future.result()
+    except Exception:
+        # Embedding errors, 429s or a scheduler timeout: BM25 hits still answer the question
+        if not lexical_ids:
+            raise
+        count("retrieval_vector_failed")
+        return (*_in_order(lexical_ids, fetch_chunks(lexical_ids)), "lexical_fallback")
+
+    if not lexical_ids:
+        return (*_in_order(vector_ids, chunks), "vector")
+
+    fused = lexical_index.reciprocal_rank_fusion([lexical_ids, vector_ids])
+    fused_ids = [chunk_id for chunk_id, _ in fused[:RETRIEVAL_K]]
+    missing = [i for i in fused_ids if i not in chunks]
+    if missing:
+        chunks.update(fetch_chunks(missing))
+    return (*_in_order(fused_ids, chunks), "hybrid")
+
+@instrumented("query_handler")
 def lambda_handler(event, context):
     """Lambda handler for Q&A using Gemini"""
     try:
@@ -85,18 +195,8 @@ def lambda_handler(event, context):
                 "body": json.dumps({"error": "Missing file_key or question"})
             }
 
-        # 1. Get embedding for the question
-        question_embedding = get_embedding_gemini(question)
-
-        # 2. Search ChromaDB
-        results = collection.query(
-            query_embeddings=[question_embedding],
-            n_results=5,
-            where={"file_key": file_key}
-        )
-
-        documents = results.get('documents', [[]])[0]
-        metadatas = results.get('metadatas', [[]])[0]
+        # 1-2. Lexical + vector retrieval from ChromaDB
+        documents, metadatas, retrieval_mode = retrieve(file_key, question)
 
         if not documents:
             return {
@@ -127,6 +227,7 @@ def lambda_handler(event, context):
                 "answer": answer,
                 "sources": sources,
                 "confidence": 0.85,
+                "retrieval": retrieval_mode,
                 "queryId": f"query_{os.urandom(8).hex()}",
                 "timestamp": str(os.urandom(8).hex())
             })
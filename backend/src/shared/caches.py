@@ -0,0 +1,48 @@
+import os
+import threading
+from collections import OrderedDict
+
+from instrumentation import cache_access
+
+
+class LRUCache:
+    """Thread-safe LRU cache that reports hits and misses to the current trace"""
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                value = self._items[key]
+                hit = True
+            else:
+                value = None
+                hit = False
+        cache_access(self.name, hit)
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+# Module-level, so they live as long as a warm Lambda container or the local server process
+question_embeddings = LRUCache("question_embedding", int(os.environ.get("QUESTION_EMBEDDING_CACHE_SIZE", "1024")))
+summaries = LRUCache("summary", int(os.environ.get("SUMMARY_CACHE_SIZE", "256")))
@@ -0,0 +1,19 @@
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Keep-alive connection pool shared by every Gemini call in the process
+GEMINI_POOL_SIZE = int(os.environ.get("GEMINI_POOL_SIZE", "32"))
+GEMINI_TIMEOUT_S = float(os.environ.get("GEMINI_TIMEOUT_S", "60"))
+
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=GEMINI_POOL_SIZE)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
+
+def post(url, **kwargs):
+    """requests.post over the pooled session, so warm containers and the local server reuse TLS connections"""
+    kwargs.setdefault("timeout", GEMINI_TIMEOUT_S)
+    return session.post(url, **kwargs)
@@ -0,0 +1,61 @@
+import os
+
+import gemini_client
+import gemini_scheduler
+from instrumentation import count, span
+
+# Chunking and embedding for ingestion. Deliberately free of ChromaDB, so bulk-ingest
+# worker processes can embed without opening the vector store the parent writes to.
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+GEMINI_EMBED_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-embedding-001:embedContent"
+
+
+def chunk_text_by_tokens(text, max_tokens=1800):
+    """
+    Splits text into chunks that are under the token limit.
+    Roughly assumes 1 token ~ 4 characters.
+    """
+    max_chars = max_tokens * 4
+    return [text[i:i+max_chars] for i in range(0, len(text), max_chars)]
+
+
+def get_embedding(text):
+    """
+    Calls Gemini's embedContent for a single chunk.
+    Returns the embedding vector.
+    """
+    try:
+        payload = {
+            "model": "models/gemini-embedding-001",
+            "content": {"parts": [{"text": text}]}
+        }
+
+        # Ingestion embeddings queue behind interactive /qa and /summarize traffic
+        gemini_scheduler.acquire(gemini_scheduler.BACKGROUND, gemini_scheduler.estimate_tokens(text))
+        with span("embed_batch"):
+            response = gemini_client.post(
+                GEMINI_EMBED_URL,
+                headers={
+                    "x-goog-api-key": GEMINI_API_KEY,
+                    "Content-Type": "application/json"
+                },
+                json=payload
+            )
+            response.raise_for_status()
+        count("embed_tokens_estimated", len(text) // 4)
+
+        data = response.json()
+        return data["embedding"]["values"]
+
+    except Exception as e:
+        raise RuntimeError(f"Gemini embedding API failed: {str(e)}")
+
+
+def embed_document(text):
+    """
+    Token-safe chunking followed by one Gemini embedding per chunk.
+    Returns (chunks, embeddings).
+    """
+    chunks = chunk_text_by_tokens(text, max_tokens=1800)
+    embeddings = [get_embedding(chunk) for chunk in chunks]
+    return chunks, embeddings
@@ -0,0 +1,209 @@
+import json
+import os
+import random
+import threading
+import time
+
+from instrumentation import current_trace
+
+# Quota shared by every caller of the Gemini API key
+GEMINI_RPM = float(os.environ.get("GEMINI_RPM", "1500"))
+GEMINI_TPM = float(os.environ.get("GEMINI_TPM", "1000000"))
+# Fraction of each bucket that background work may not touch, kept for interactive requests
+BACKGROUND_RESERVE = float(os.environ.get("GEMINI_BACKGROUND_RESERVE", "0.2"))
+# DynamoDB table for cross-process coordination; without it the buckets are per process
+SCHEDULER_TABLE = os.environ.get("GEMINI_SCHEDULER_TABLE")
+SCHEDULER_KEY = os.environ.get("GEMINI_SCHEDULER_KEY", "gemini")
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+MAX_WAIT_S = {
+    INTERACTIVE: float(os.environ.get("GEMINI_INTERACTIVE_MAX_WAIT_S", "20")),
+    BACKGROUND: float(os.environ.get("GEMINI_BACKGROUND_MAX_WAIT_S", "300"))
+}
+# Time kept back from the function timeout so a handler can still report RateLimitTimeout
+DEADLINE_MARGIN_S = float(os.environ.get("GEMINI_DEADLINE_MARGIN_S", "5"))
+# Upper bound of the jittered pause after losing a compare-and-set race
+CONFLICT_BACKOFF_S = float(os.environ.get("GEMINI_CONFLICT_BACKOFF_S", "0.05"))
+
+
+class RateLimitTimeout(RuntimeError):
+    pass
+
+
+class InMemoryStore:
+    """Versioned key/value store for a single process; the local stand-in for DynamoDBStore"""
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            state, version = self._items.get(key, (None, 0))
+            return (dict(state) if state else None), version
+
+    def compare_and_set(self, key, state, expected_version):
+        with self._lock:
+            if self._items.get(key, (None, 0))[1] != expected_version:
+                return False
+            self._items[key] = (dict(state), expected_version + 1)
+            return True
+
+
+class DynamoDBStore:
+    """Same contract as InMemoryStore, using conditional writes so concurrent Lambdas stay consistent"""
+
+    def __init__(self, table_name, client=None):
+        import boto3
+
+        self.table_name = table_name
+        self.client = client or boto3.client("dynamodb")
+
+    def get(self, key):
+        item = self.client.get_item(
+            TableName=self.table_name, Key={"pk": {"S": key}}, ConsistentRead=True
+        ).get("Item")
+        if not item:
+            return None, 0
+        return json.loads(item["state"]["S"]), int(item["version"]["N"])
+
+    def compare_and_set(self, key, state, expected_version):
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    "pk": {"S": key},
+                    "state": {"S": json.dumps(state)},
+                    "version": {"N": str(expected_version + 1)}
+                },
+                ConditionExpression="attribute_not_exists(pk) OR version = :v",
+                ExpressionAttributeValues={":v": {"N": str(expected_version)}}
+            )
+            return True
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+
+
+class GeminiScheduler:
+    """
+    Token-bucket rate limiter for requests/min and tokens/min with two priority lanes.
+    Interactive calls may drain the buckets; background calls must leave `background_reserve`
+    of each bucket untouched and also step aside while an interactive call in this process waits.
+    """
+
+    def __init__(self, store, requests_per_min=GEMINI_RPM, tokens_per_min=GEMINI_TPM,
+                 background_reserve=BACKGROUND_RESERVE, key=SCHEDULER_KEY, clock=time.time, sleep=time.sleep):
+        self.store = store
+        self.requests_per_min = requests_per_min
+        self.tokens_per_min = tokens_per_min
+        self.background_reserve = background_reserve
+        self.key = key
+        self.clock = clock
+        self.sleep = sleep
+        self._interactive_waiting = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, state, now):
+        if state is None:
+            return {"requests": self.requests_per_min, "tokens": self.tokens_per_min, "updated_at": now}
+        elapsed = max(0.0, now - state["updated_at"])
+        return {
+            "requests": min(self.requests_per_min, state["requests"] + elapsed * self.requests_per_min / 60),
+            "tokens": min(self.tokens_per_min, state["tokens"] + elapsed * self.tokens_per_min / 60),
+            "updated_at": max(now, state["updated_at"])
+        }
+
+    def _try_acquire(self, lane, tokens):
+        """Returns 0 when granted, otherwise the estimated seconds until the buckets can cover the call"""
+        reserve = self.background_reserve if lane == BACKGROUND else 0.0
+        need_requests = 1 + reserve * self.requests_per_min
+        need_tokens = tokens + reserve * self.tokens_per_min
+
+        while True:
+            state, version = self.store.get(self.key)
+            state = self._refill(state, self.clock())
+            if state["requests"] >= need_requests and state["tokens"] >= need_tokens:
+                state["requests"] -= 1
+                state["tokens"] -= tokens
+                if self.store.compare_and_set(self.key, state, version):
+                    return 0.0
+                # Another caller updated the bucket first; back off briefly so contending
+                # processes don't hammer the single item, then re-read and retry
+                self.sleep(random.uniform(CONFLICT_BACKOFF_S / 2, CONFLICT_BACKOFF_S))
+                continue
+            return max(
+                (need_requests - state["requests"]) * 60 / self.requests_per_min,
+                (need_tokens - state["tokens"]) * 60 / self.tokens_per_min
+            )
+
+    def acquire(self, lane, tokens):
+        """Blocks until the call may proceed; returns the queue wait in seconds"""
+        if lane not in MAX_WAIT_S:
+            raise ValueError(f"Unknown Gemini scheduler lane: {lane}")
+        # A single oversized request could never fit a full bucket
+        tokens = min(tokens, self.tokens_per_min * (1 - self.background_reserve))
+
+        max_wait = MAX_WAIT_S[lane]
+        remaining = current_trace().remaining_s()
+        if remaining is not None:
+            max_wait = max(0.0, min(max_wait, remaining - DEADLINE_MARGIN_S))
+
+        # Measured on the scheduler's clock, so injected clocks drive the timeout too
+        started = self.clock()
+        if lane == INTERACTIVE:
+            with self._lock:
+                self._interactive_waiting += 1
+        try:
+            while True:
+                if lane == BACKGROUND and self._interactive_waiting:
+                    wait_s = 0.05
+                else:
+                    wait_s = self._try_acquire(lane, tokens)
+                    if wait_s == 0:
+                        break
+
+                waited = self.clock() - started
+                if waited + wait_s > max_wait:
+                    raise RateLimitTimeout(
+                        f"Gemini {lane} request not admitted within {max_wait:.0f}s (rate limit)"
+                    )
+                # Jitter keeps concurrent waiters from retrying in lockstep
+                self.sleep(min(wait_s, 1.0) * random.uniform(1.0, 1.2))
+        finally:
+            if lane == INTERACTIVE:
+                with self._lock:
+                    self._interactive_waiting -= 1
+
+        queue_wait = max(0.0, self.clock() - started)
+        current_trace().add_span(f"gemini_queue_wait_{lane}", queue_wait * 1000)
+        return queue_wait
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            store = DynamoDBStore(SCHEDULER_TABLE) if SCHEDULER_TABLE else InMemoryStore()
+            _scheduler = GeminiScheduler(store)
+        return _scheduler
+
+
+def set_scheduler(scheduler):
+    """Swap the process-wide scheduler, e.g. for an in-memory one in local runs"""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+
+def estimate_tokens(text):
+    # Same heuristic as the chunker: 1 token ~ 4 characters
+    return max(1, len(text) // 4)
+
+
+def acquire(lane, tokens):
+    return get_scheduler().acquire(lane, tokens)
@@ -0,0 +1,236 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# CloudWatch Embedded Metric Format settings
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "AnvitaAI")
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+INCLUDE_TIMING = os.environ.get("INCLUDE_TIMING", "false").lower() == "true"
+
+_current_trace = contextvars.ContextVar("anvita_trace", default=None)
+_warm_container = False
+
+
+class Trace:
+    """
+    Collects timing spans, counters and cache accesses for one handler invocation.
+    Spans with the same name are accumulated (e.g. one ocr_page span per page).
+    """
+
+    def __init__(self, handler_name, request_id=None):
+        self.handler_name = handler_name
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        # perf_counter() value at which the runtime kills the invocation, when known
+        self.deadline = None
+        self.spans = {}
+        self.counters = {}
+        self.caches = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, (time.perf_counter() - start) * 1000)
+
+    def add_span(self, name, duration_ms):
+        with self._lock:
+            entry = self.spans.setdefault(name, {"total_ms": 0.0, "count": 0, "max_ms": 0.0})
+            entry["total_ms"] += duration_ms
+            entry["count"] += 1
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+
+    def count(self, name, value=1, unit="Count"):
+        with self._lock:
+            entry = self.counters.setdefault(name, {"value": 0, "unit": unit})
+            entry["value"] += value
+
+    def cache_access(self, name, hit):
+        with self._lock:
+            entry = self.caches.setdefault(name, {"hits": 0, "misses": 0})
+            entry["hits" if hit else "misses"] += 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def remaining_s(self):
+        """Seconds left before the function timeout, or None outside Lambda"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.perf_counter()
+
+    def breakdown(self):
+        """Timing breakdown suitable for embedding in a response body"""
+        with self._lock:
+            return {
+                "total_ms": round(self.elapsed_ms(), 2),
+                "spans": {
+                    name: {
+                        "total_ms": round(s["total_ms"], 2),
+                        "count": s["count"],
+                        "max_ms": round(s["max_ms"], 2)
+                    }
+                    for name, s in self.spans.items()
+                },
+                "counters": {name: c["value"] for name, c in self.counters.items()},
+                "caches": {
+                    name: dict(c, hit_rate=_hit_rate(c))
+                    for name, c in self.caches.items()
+                }
+            }
+
+    def to_emf(self, status_code=None):
+        """Build a CloudWatch Embedded Metric Format record"""
+        metrics = [{"Name": "duration_ms", "Unit": "Milliseconds"}]
+        record = {"duration_ms": round(self.elapsed_ms(), 2)}
+
+        with self._lock:
+            for name, s in self.spans.items():
+                metrics.append({"Name": f"{name}_ms", "Unit": "Milliseconds"})
+                record[f"{name}_ms"] = round(s["total_ms"], 2)
+                record[f"{name}_calls"] = s["count"]
+            for name, c in self.counters.items():
+                metrics.append({"Name": name, "Unit": c["unit"]})
+                record[name] = c["value"]
+            for name, c in self.caches.items():
+                metrics.append({"Name": f"{name}_cache_hit_rate", "Unit": "Percent"})
+                record[f"{name}_cache_hit_rate"] = _hit_rate(c) * 100
+                record[f"{name}_cache_hits"] = c["hits"]
+                record[f"{name}_cache_misses"] = c["misses"]
+
+        record.update({
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [["Handler"]],
+                    "Metrics": metrics
+                }]
+            },
+            "Handler": self.handler_name,
+            "RequestId": self.request_id,
+            "StatusCode": status_code
+        })
+        return record
+
+
+class _NullTrace(Trace):
+    """Used when code runs outside an instrumented handler; records nothing"""
+
+    def __init__(self):
+        super().__init__("none")
+
+    def add_span(self, name, duration_ms):
+        pass
+
+    def count(self, name, value=1, unit="Count"):
+        pass
+
+    def cache_access(self, name, hit):
+        pass
+
+
+_NULL_TRACE = _NullTrace()
+
+
+def _hit_rate(cache):
+    total = cache["hits"] + cache["misses"]
+    return cache["hits"] / total if total else 0.0
+
+
+def current_trace():
+    return _current_trace.get() or _NULL_TRACE
+
+
+def span(name):
+    """Time a block under the current handler's trace: `with span("chroma_query"): ...`"""
+    return current_trace().span(name)
+
+
+def count(name, value=1, unit="Count"):
+    current_trace().count(name, value, unit)
+
+
+def cache_access(name, hit):
+    current_trace().cache_access(name, hit)
+
+
+def record_token_usage(gemini_response):
+    """Record prompt/output token counts from a Gemini generateContent response"""
+    usage = gemini_response.get("usageMetadata") or {}
+    count("llm_prompt_tokens", usage.get("promptTokenCount", 0))
+    count("llm_output_tokens", usage.get("candidatesTokenCount", 0))
+
+
+def timing_requested(event):
+    """A caller opts into the timing breakdown with ?timing=true, an X-Anvita-Timing header or "timing": true"""
+    if INCLUDE_TIMING:
+        return True
+    if not isinstance(event, dict):
+        return False
+
+    query_params = event.get("queryStringParameters") or {}
+    headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+    flags = [query_params.get("timing"), headers.get("x-anvita-timing"), event.get("timing")]
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+        if isinstance(body, dict):
+            flags.append(body.get("timing"))
+    except (TypeError, ValueError):
+        pass
+
+    return any(str(flag).lower() in ("1", "true", "yes") for flag in flags if flag is not None)
+
+
+def emit(trace, status_code=None):
+    if METRICS_ENABLED:
+        print(json.dumps(trace.to_emf(status_code), default=str))
+
+
+def instrumented(handler_name):
+    """
+    Decorator for lambda_handler functions.
+    Opens a trace for the invocation, emits it as an EMF log line and, when
+    requested, adds a "timing" breakdown to the JSON response body.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            global _warm_container
+
+            trace = Trace(handler_name, getattr(context, "aws_request_id", None))
+            if hasattr(context, "get_remaining_time_in_millis"):
+                trace.deadline = trace.started + context.get_remaining_time_in_millis() / 1000
+            # Warm containers reuse module-level clients (S3, Chroma, HTTP sessions)
+            trace.cache_access("container", _warm_container)
+            _warm_container = True
+
+            token = _current_trace.set(trace)
+            try:
+                response = handler(event, context)
+            finally:
+                _current_trace.reset(token)
+
+            status_code = response.get("statusCode") if isinstance(response, dict) else None
+            emit(trace, status_code)
+
+            if timing_requested(event) and isinstance(response, dict):
+                try:
+                    body = json.loads(response.get("body") or "{}")
+                except (TypeError, ValueError):
+                    body = None
+                if isinstance(body, dict):
+                    body["timing"] = trace.breakdown()
+                    response["body"] = json.dumps(body)
+
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+
+from caches import LRUCache
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+LEXICAL_INDEX_CACHE_SIZE = int(os.environ.get("LEXICAL_INDEX_CACHE_SIZE", "128"))
+
+# Keeps identifiers such as "inv-10234", "4.2" or "a/b-7" together as one token
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-./_][a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by does for from has how in is it of on or say said says that the "
+    "this to was what when where which who why with about document".split()
+)
+
+
+def tokenize(text):
+    """
+    Lowercased word tokens without stopwords. Compound identifiers are emitted
+    whole and also split into their parts, so "INV-10234" matches "10234" too.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = re.split(r"[-./_]", token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p and p not in _STOPWORDS)
+    return tokens
+
+
+def is_identifier(token):
+    """Codes such as "inv-10234", "4.2" or "a7": digits mixed with letters or separators, never a bare number"""
+    has_digit = any(c.isdigit() for c in token)
+    has_letter = any(c.isalpha() for c in token)
+    has_separator = any(c in "-./_" for c in token)
+    return has_digit and (has_letter or has_separator)
+
+
+def build_index(doc_id, chunks):
+    """Inverted index over a document's chunks: {"doc_id", "doc_lens", "avgdl", "postings": {term: [[chunk, tf]]}}"""
+    postings = {}
+    doc_lens = []
+    for chunk_id, chunk in enumerate(chunks):
+        tokens = tokenize(chunk)
+        doc_lens.append(len(tokens))
+        frequencies = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for token, tf in frequencies.items():
+            postings.setdefault(token, []).append([chunk_id, tf])
+    return {
+        "doc_id": doc_id,
+        "doc_lens": doc_lens,
+        "avgdl": (sum(doc_lens) / len(doc_lens)) if doc_lens else 0.0,
+        "postings": postings
+    }
+
+
+def search(index, query, k=5):
+    """BM25 over the document's chunks; returns [(chunk_id, score)] best first"""
+    n = len(index["doc_lens"])
+    if not n:
+        return []
+    avgdl = index["avgdl"] or 1.0
+    scores = {}
+    for term in set(tokenize(query)):
+        postings = index["postings"].get(term)
+        if not postings:
+            continue
+        idf = math.log((n - len(postings) + 0.5) / (len(postings) + 0.5) + 1)
+        for chunk_id, tf in postings:
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * index["doc_lens"][chunk_id] / avgdl)
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def is_confident(index, query, hits, min_margin):
+    """
+    True when the question names exact identifiers (see is_identifier), the top
+    lexical hit contains every one of them, and it outscores the runner-up by
+    `min_margin` times. Open questions never qualify: matching wording or bare
+    numbers alone are not enough evidence to skip the embedding.
+    """
+    if not hits:
+        return False
+    if len(hits) > 1 and hits[0][1] < hits[1][1] * min_margin:
+        return False
+    # Whole tokens only: the parts tokenize() splits out of "inv-10234" are not identifiers themselves
+    identifiers = {t for t in _TOKEN_RE.findall(query.lower()) if is_identifier(t)}
+    if not identifiers:
+        return False
+    top_chunk = hits[0][0]
+    return all(
+        any(chunk_id == top_chunk for chunk_id, _ in index["postings"].get(term, []))
+        for term in identifiers
+    )
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Merges ranked id lists; returns [(id, score)] best first"""
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalIndexStore:
+    """One JSON index file per file_key, kept next to the Chroma data"""
+
+    def __init__(self, root):
+        self.root = root
+        self._cache = LRUCache("lexical_index", LEXICAL_INDEX_CACHE_SIZE)
+
+    def _path(self, file_key):
+        return os.path.join(self.root, hashlib.sha1(file_key.encode("utf-8")).hexdigest() + ".json")
+
+    def save(self, file_key, index):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(file_key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(dict(index, file_key=file_key), f)
+        os.replace(tmp_path, path)
+        self._cache.put(file_key, (os.stat(path).st_mtime_ns, index))
+
+    def load(self, file_key):
+        """The document's index, or None when it was ingested before lexical indexing existed"""
+        path = self._path(file_key)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._cache.get(file_key)
+        # Another process may have re-ingested the document since it was cached
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path) as f:
+            index = json.load(f)
+        self._cache.put(file_key, (mtime, index))
+        return index
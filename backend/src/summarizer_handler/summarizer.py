@@ -1,9 +1,22 @@
 import boto3
 import json
 import os
-import requests
+import sys
 import chromadb
 
+try:
+    from instrumentation import instrumented, span, count, record_token_usage
+    import caches
+    import gemini_client
+    import gemini_scheduler
+except ImportError:
+    # Running outside Lambda, where the shared layer isn't mounted
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+    from instrumentation import instrumented, span, count, record_token_usage
+    import caches
+    import gemini_client
+    import gemini_scheduler
+
 s3 = boto3.client('s3')
 
 # Environment variables
@@ -22,28 +35,33 @@ collection = chroma_client.get_or_create_collection(name="documents")
 def call_gemini_llm(prompt, max_tokens=2048):
     """Call Gemini 2.0 Flash API for summarization."""
     try:
-        response = requests.post(
-            GEMINI_GENERATE_URL,
-            headers={
-                "Content-Type": "application/json",
-                "x-goog-api-key": GEMINI_API_KEY
-            },
-            json={
-                "contents": [
-                    {
-                        "parts": [
-                            {"text": prompt}
-                        ]
+        gemini_scheduler.acquire(
+            gemini_scheduler.INTERACTIVE, gemini_scheduler.estimate_tokens(prompt) + max_tokens
+        )
+        with span("llm_generate"):
+            response = gemini_client.post(
+                GEMINI_GENERATE_URL,
+                headers={
+                    "Content-Type": "application/json",
+                    "x-goog-api-key": GEMINI_API_KEY
+                },
+                json={
+                    "contents": [
+                        {
+                            "parts": [
+                                {"text": prompt}
+                            ]
+                        }
+                    ],
+                    "generationConfig": {
+                        "maxOutputTokens": max_tokens,
+                        "temperature": 0.7
                     }
-                ],
-                "generationConfig": {
-                    "maxOutputTokens": max_tokens,
-                    "temperature": 0.7
                 }
-            }
-        )
-        response.raise_for_status()
+            )
+            response.raise_for_status()
         data = response.json()
+        record_token_usage(data)
         return data["candidates"][0]["content"]["parts"][0]["text"]
     except Exception as e:
         raise RuntimeError(f"Gemini API call failed: {str(e)}")
@@ -63,6 +81,7 @@ Content:
 """
 
 
+@instrumented("summarizer")
 def lambda_handler(event, context):
     """Lambda handler for document summarization using ChromaDB + Gemini"""
     try:
@@ -77,8 +96,10 @@ def lambda_handler(event, context):
             }
 
         # Retrieve all chunks for this file from ChromaDB
-        results = collection.get(where={"file_key": file_key})
+        with span("chroma_get"):
+            results = collection.get(where={"file_key": file_key})
         documents = results.get('documents', [])
+        count("chunks_retrieved", len(documents))
         
         if not documents:
             return {
@@ -89,11 +110,16 @@ def lambda_handler(event, context):
                 })
             }
 
-        # Create prompt from retrieved chunks
-        prompt = get_summary_prompt(documents)
+        # Reuse the summary while the document's chunks are unchanged
+        cache_key = (file_key, tuple(sorted(results.get('ids', []))))
+        summary = caches.summaries.get(cache_key)
+        if summary is None:
+            # Create prompt from retrieved chunks
+            prompt = get_summary_prompt(documents)
 
-        # Generate summary via Gemini
-        summary = call_gemini_llm(prompt, max_tokens=2048)
+            # Generate summary via Gemini
+            summary = call_gemini_llm(prompt, max_tokens=2048)
+            caches.summaries.put(cache_key, summary)
 
         return {
             "statusCode": 200,
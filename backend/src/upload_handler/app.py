@@ -2,8 +2,16 @@ import boto3
 import os
 import json
 import uuid
+import sys
 import time
 
+try:
+    from instrumentation import instrumented, span
+except ImportError:
+    # Running outside Lambda, where the shared layer isn't mounted
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+    from instrumentation import instrumented, span
+
 s3 = boto3.client('s3')
 
 BUCKET_NAME = os.environ.get('BUCKET_NAME')
@@ -18,8 +26,10 @@ SUPPORTED_MIME_TYPES = {
     'application/vnd.oasis.opendocument.text',  # .odt
 }
 
-ALLOWED_TYPES = set(os.environ.get('ALLOWED_FILE_TYPES', '').split(',')) or SUPPORTED_MIME_TYPES
+# An unset or empty ALLOWED_FILE_TYPES (e.g. the local server) allows every supported type
+ALLOWED_TYPES = {t.strip() for t in os.environ.get('ALLOWED_FILE_TYPES', '').split(',') if t.strip()} or SUPPORTED_MIME_TYPES
 
+@instrumented("upload_handler")
 def lambda_handler(event, context):
     try:
         body = json.loads(event['body'])
@@ -37,15 +47,16 @@ def lambda_handler(event, context):
             return respond(400, f"File too large. Max {MAX_SIZE_MB}MB allowed.")
 
         key = f"uploads/{int(time.time())}_{uuid.uuid4()}_{file_name.replace(' ', '_')}"
-        url = s3.generate_presigned_url(
-            ClientMethod='put_object',
-            Params={
-                'Bucket': BUCKET_NAME,
-                'Key': key,
-                'ContentType': file_type
-            },
-            ExpiresIn=300  # 5 minutes
-        )
+        with span("s3_presign"):
+            url = s3.generate_presigned_url(
+                ClientMethod='put_object',
+                Params={
+                    'Bucket': BUCKET_NAME,
+                    'Key': key,
+                    'ContentType': file_type
+                },
+                ExpiresIn=300  # 5 minutes
+            )
 
         return respond(200, {
             "uploadUrl": url,
@@ -0,0 +1,133 @@
+"""
+Synthetic document corpus for the offline benchmarks.
+Generates text PDFs, DOCX files, scanned (image-only) PDFs and TXT files with
+deterministic content, so runs on different commits process identical input.
+"""
+import io
+import random
+
+WORDS = (
+    "agreement invoice payment clause party delivery schedule warranty liability "
+    "termination notice period amount customer supplier contract service quarter "
+    "revenue budget report meeting project milestone risk review approval policy "
+    "employee benefit training compliance audit security data storage network"
+).split()
+
+KINDS = ("pdf", "docx", "scanned", "txt")
+
+
+def synthetic_text(rng, paragraphs, words_per_paragraph=120):
+    out = []
+    for p in range(paragraphs):
+        words = [rng.choice(WORDS) for _ in range(words_per_paragraph)]
+        words[0] = words[0].capitalize()
+        # Exact identifiers give the query phase something specific to ask about
+        words.insert(rng.randrange(len(words)), f"Clause {p + 1}.{rng.randint(1, 9)}")
+        words.insert(rng.randrange(len(words)), f"INV-{rng.randint(10000, 99999)}")
+        out.append(" ".join(words) + ".")
+    return out
+
+
+def make_pdf(paragraphs, paragraphs_per_page=4):
+    import fitz
+
+    doc = fitz.open()
+    for i in range(0, len(paragraphs), paragraphs_per_page):
+        page = doc.new_page()
+        text = "\n\n".join(paragraphs[i:i + paragraphs_per_page])
+        page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), text, fontsize=9)
+    return doc.tobytes()
+
+
+def make_scanned_pdf(paragraphs, paragraphs_per_page=2):
+    """Image-only pages, which forces the extractor down the OCR path"""
+    import textwrap
+    import fitz
+    from PIL import Image, ImageDraw
+
+    doc = fitz.open()
+    for i in range(0, len(paragraphs), paragraphs_per_page):
+        image = Image.new("RGB", (1240, 1754), "white")
+        draw = ImageDraw.Draw(image)
+        y = 60
+        for paragraph in paragraphs[i:i + paragraphs_per_page]:
+            for line in textwrap.wrap(paragraph, width=100):
+                draw.text((60, y), line, fill="black")
+                y += 16
+            y += 24
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=buffer.getvalue())
+    return doc.tobytes()
+
+
+def make_docx(paragraphs):
+    import docx
+
+    document = docx.Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def build_document(kind, rng, paragraphs):
+    text = synthetic_text(rng, paragraphs)
+    if kind == "pdf":
+        return make_pdf(text), text
+    if kind == "scanned":
+        return make_scanned_pdf(text), text
+    if kind == "docx":
+        return make_docx(text), text
+    if kind == "txt":
+        return "\n\n".join(text).encode("utf-8"), text
+    raise ValueError(f"Unknown document kind: {kind}")
+
+
+QUESTION_KINDS = ("identifier", "clause", "open")
+
+
+def make_question(kind, text, rng):
+    """One question of the given kind drawn from the document itself"""
+    if kind == "identifier":
+        identifiers = [w.strip(".,") for p in text for w in p.split() if w.startswith("INV-")]
+        if identifiers:
+            return f"What does the document say about invoice {rng.choice(identifiers)}?"
+    elif kind == "clause":
+        clauses = [p.split("Clause ", 1)[1].split()[0].strip(".,") for p in text if "Clause " in p]
+        if clauses:
+            return f"Summarize clause {rng.choice(clauses)}."
+    return f"What is said about {rng.choice(WORDS)} and {rng.choice(WORDS)}?"
+
+
+def questions_for(text, rng, n):
+    """Even mix of identifier lookups, clause lookups and open questions"""
+    return [make_question(QUESTION_KINDS[i % len(QUESTION_KINDS)], text, rng) for i in range(n)]
+
+
+def generate_corpus(s3, bucket, kinds=KINDS, docs_per_kind=3, paragraphs=12, questions_per_doc=5, seed=42,
+                    name="bench"):
+    """
+    Uploads the corpus to `s3` under uploads/ and returns one entry per document:
+    {"file_key", "kind", "size_bytes", "paragraphs", "text", "questions"}
+    """
+    rng = random.Random(seed)
+    extensions = {"pdf": ".pdf", "scanned": ".pdf", "docx": ".docx", "txt": ".txt"}
+    corpus = []
+    for kind in kinds:
+        for i in range(docs_per_kind):
+            data, text = build_document(kind, rng, paragraphs)
+            file_key = f"uploads/{name}_{kind}_{i:04d}{extensions[kind]}"
+            s3.put_object(Bucket=bucket, Key=file_key, Body=data)
+            corpus.append({
+                "file_key": file_key,
+                "kind": kind,
+                "size_bytes": len(data),
+                "paragraphs": paragraphs,
+                "text": text,
+                "questions": questions_for(text, rng, questions_per_doc)
+            })
+    return corpus
@@ -0,0 +1,108 @@
+"""
+Imports the real handler modules and points them at local stand-ins:
+one LocalS3, one FakeGeminiServer and one shared on-disk Chroma collection
+with its lexical indexes.
+"""
+import json
+import os
+import shutil
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "src", "shared"))
+
+# Default Gemini quota for offline runs: high enough that the client-side scheduler
+# never throttles, so results measure the handlers rather than the rate limit
+UNLIMITED_RPM = 1e9
+UNLIMITED_TPM = 1e12
+
+
+def prepare_environment(workdir, bucket, gemini_rpm=None, gemini_tpm=None, enable_caches=False):
+    """
+    Must run before the handler modules are imported; they read their config at import time.
+    Pass gemini_rpm/gemini_tpm to run against a real quota instead of an unlimited one.
+    The summary and question-embedding caches are off unless enable_caches is set, so
+    every call exercises the Chroma/Gemini path.
+    """
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "offline")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "offline")
+    os.environ["BUCKET_NAME"] = bucket
+    os.environ["GEMINI_API_KEY"] = "offline"
+    os.environ["CHROMA_PATH"] = os.path.join(workdir, "chromadb")
+    os.environ.setdefault("METRICS_ENABLED", "false")
+    os.environ.pop("EMBEDDING_LAMBDA_NAME", None)
+    # Rate limiting runs against the in-memory store
+    os.environ.pop("GEMINI_SCHEDULER_TABLE", None)
+    os.environ["GEMINI_RPM"] = str(gemini_rpm or UNLIMITED_RPM)
+    os.environ["GEMINI_TPM"] = str(gemini_tpm or UNLIMITED_TPM)
+    if enable_caches:
+        os.environ.pop("SUMMARY_CACHE_SIZE", None)
+        os.environ.pop("QUESTION_EMBEDDING_CACHE_SIZE", None)
+    else:
+        os.environ["SUMMARY_CACHE_SIZE"] = "0"
+        os.environ["QUESTION_EMBEDDING_CACHE_SIZE"] = "0"
+
+
+def load_handlers(s3, gemini, chroma_path):
+    """Returns the five handler modules wired to the given stand-ins"""
+    import chromadb
+    import gemini_embeddings
+    import lexical_index
+    import pytesseract
+    from src.embedding_handler import embedding_handler
+    from src.extract_loader import extract_loader
+    from src.query_handler import query_handler
+    from src.summarizer_handler import summarizer
+    from src.upload_handler import app as upload_handler
+
+    collection = chromadb.PersistentClient(path=chroma_path).get_or_create_collection(name="documents")
+
+    for module in (embedding_handler, extract_loader, summarizer, upload_handler):
+        module.s3 = s3
+    lexical_store = lexical_index.LexicalIndexStore(os.path.join(chroma_path, "lexical"))
+    for module in (embedding_handler, query_handler, summarizer):
+        module.collection = collection
+    for module in (embedding_handler, query_handler):
+        module.lexical_store = lexical_store
+
+    gemini_embeddings.GEMINI_EMBED_URL = gemini.embed_url
+    query_handler.GEMINI_EMBED_URL = gemini.embed_url
+    query_handler.GEMINI_FLASH_URL = gemini.generate_url
+    summarizer.GEMINI_GENERATE_URL = gemini.generate_url
+
+    # The Lambda layer path for tesseract doesn't exist locally
+    extract_loader.EMBEDDING_LAMBDA = None
+    local_tesseract = shutil.which("tesseract")
+    if local_tesseract:
+        pytesseract.pytesseract.tesseract_cmd = local_tesseract
+
+    return {
+        "upload": upload_handler,
+        "extract": extract_loader,
+        "embed": embedding_handler,
+        "query": query_handler,
+        "summarize": summarizer
+    }
+
+
+def ocr_available():
+    return shutil.which("tesseract") is not None
+
+
+def ingest_document(handlers, bucket, file_key):
+    """Extract + embed one uploaded document, the way extract_loader's Lambda hop would"""
+    extract = handlers["extract"].lambda_handler(
+        {"body": json.dumps({"bucket": bucket, "fileKey": file_key})}, None
+    )
+    if extract["statusCode"] != 200:
+        raise RuntimeError(f"Extraction failed for {file_key}: {extract['body']}")
+    text_key = json.loads(extract["body"])["text_key"]
+
+    embed = handlers["embed"].lambda_handler(
+        {"bucket": bucket, "text_key": text_key, "file_key": file_key}, None
+    )
+    if embed["statusCode"] != 200:
+        raise RuntimeError(f"Embedding failed for {file_key}: {embed['body']}")
+    return json.loads(embed["body"])["chunks_ingested"]
@@ -0,0 +1,333 @@
+"""
+Concurrent load generator for the /qa and /summarize paths.
+
+Drives query_handler and summarizer either in-process (real handlers wired to
+the offline stand-ins, over a freshly ingested corpus) or over HTTP against a
+running server. Each concurrency level runs closed-loop workers for a fixed
+duration and reports throughput, p50/p95/p99 latency per operation and
+document size, and an error breakdown. Running several levels in one go
+shows where the Chroma/Gemini path saturates.
+
+Usage:
+    python testing/benchmark/load_test.py --concurrency 1,4,16,32 --duration-s 20
+    python testing/benchmark/load_test.py --mode http --url http://localhost:8000 \\
+        --file-keys uploads/a.pdf,uploads/b.docx --concurrency 8,32
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import QUESTION_KINDS, generate_corpus, make_question
+from harness import ingest_document, load_handlers, prepare_environment
+from local_stubs import FakeGeminiServer, LocalS3
+from stats import StageTimings, latency_summary, peak_rss_mb
+
+BUCKET = "anvita-loadtest"
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+HTTP_CACHE_NOTE = (
+    "Note: the server may answer repeated summaries and questions from its caches; start it with "
+    "SUMMARY_CACHE_SIZE=0 QUESTION_EMBEDDING_CACHE_SIZE=0 to measure the Chroma/Gemini path"
+)
+
+
+def parse_weights(spec, allowed):
+    """"qa=0.8,summarize=0.2" -> {"qa": 0.8, "summarize": 0.2}"""
+    weights = {}
+    for part in filter(None, spec.split(",")):
+        name, _, weight = part.partition("=")
+        if name not in allowed:
+            raise SystemExit(f"Unknown entry {name!r}; expected one of {', '.join(allowed)}")
+        weights[name] = float(weight or 1)
+    if not any(w > 0 for w in weights.values()):
+        raise SystemExit(f"{spec!r} needs at least one positive weight")
+    return weights
+
+
+def _error_key(status, body):
+    try:
+        message = json.loads(body).get("error", "")
+    except (TypeError, ValueError, AttributeError):
+        message = str(body)
+    return f"{status}: {message}"[:120]
+
+
+def _timing(body):
+    """The handler's timing breakdown from a response body, if it has one"""
+    try:
+        return json.loads(body).get("timing")
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class InProcessClient:
+    """Requests the timing breakdown so Gemini queue waits can be reported per level"""
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+
+    def qa(self, file_key, question):
+        response = self.handlers["query"].lambda_handler(
+            {"body": json.dumps({"file_key": file_key, "question": question, "timing": True})}, None
+        )
+        return response["statusCode"], response["body"]
+
+    def summarize(self, file_key):
+        response = self.handlers["summarize"].lambda_handler(
+            {"queryStringParameters": {"file_key": file_key, "timing": "true"}}, None
+        )
+        return response["statusCode"], response["body"]
+
+
+class HttpClient:
+    """One requests.Session per worker thread, like independent browser clients"""
+
+    def __init__(self, base_url, timeout_s):
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        import requests
+
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def qa(self, file_key, question):
+        response = self.session.post(
+            f"{self.base_url}/qa", json={"file_key": file_key, "question": question, "timing": True}, timeout=self.timeout_s
+        )
+        return response.status_code, response.text
+
+    def summarize(self, file_key):
+        response = self.session.get(
+            f"{self.base_url}/summarize", params={"file_key": file_key, "timing": "true"}, timeout=self.timeout_s
+        )
+        return response.status_code, response.text
+
+
+def worker(client, targets, op_mix, question_mix, deadline, warmup_until, samples, lock, seed):
+    rng = random.Random(seed)
+    ops, op_weights = zip(*op_mix.items())
+    kinds, kind_weights = zip(*question_mix.items())
+
+    while time.perf_counter() < deadline:
+        target = rng.choice(targets)
+        op = rng.choices(ops, op_weights)[0]
+        question_kind = rng.choices(kinds, kind_weights)[0] if op == "qa" else None
+
+        started = time.perf_counter()
+        try:
+            if op == "qa":
+                status, body = client.qa(target["file_key"], make_question(question_kind, target["text"], rng))
+            else:
+                status, body = client.summarize(target["file_key"])
+            error = None if status == 200 else _error_key(status, body)
+        except Exception as e:
+            status, body, error = 0, None, f"{type(e).__name__}: {e}"[:120]
+        finished = time.perf_counter()
+
+        if started >= warmup_until:
+            with lock:
+                samples.append({
+                    "op": op,
+                    "size": target["size"],
+                    "question_kind": question_kind,
+                    "latency_ms": (finished - started) * 1000,
+                    "status": status,
+                    "error": error,
+                    "timing": _timing(body)
+                })
+
+
+def run_level(client, targets, concurrency, args, op_mix, question_mix):
+    samples, lock = [], threading.Lock()
+    now = time.perf_counter()
+    warmup_until = now + args.warmup_s
+    deadline = warmup_until + args.duration_s
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(
+                worker, client, targets, op_mix, question_mix, deadline, warmup_until,
+                samples, lock, args.seed * 1000 + i
+            )
+            for i in range(concurrency)
+        ]
+        # A worker that dies outside its per-request try would silently skew the level
+        for future in futures:
+            future.result()
+
+    # Requests in flight at the deadline still finish and are counted, so measure
+    # up to the last completion rather than assuming exactly duration_s
+    measured_s = time.perf_counter() - warmup_until
+    ok = [s for s in samples if s["error"] is None]
+    errors = {}
+    for s in samples:
+        if s["error"] is not None:
+            errors[s["error"]] = errors.get(s["error"], 0) + 1
+
+    by_op = {}
+    for op in op_mix:
+        op_samples = [s for s in samples if s["op"] == op]
+        by_op[op] = {
+            "latency": latency_summary([s["latency_ms"] for s in op_samples]),
+            "by_size": {
+                size: latency_summary([s["latency_ms"] for s in op_samples if s["size"] == size])
+                for size in dict.fromkeys(t["size"] for t in targets)
+            }
+        }
+    stages = StageTimings()
+    for s in samples:
+        stages.add(s["timing"])
+    # Time spent waiting on the client-side Gemini scheduler, per request that called Gemini
+    queue_wait = {name: data for name, data in stages.summary().items() if name.startswith("gemini_queue_wait")}
+
+    if "qa" in by_op:
+        by_op["qa"]["by_question_kind"] = {
+            kind: latency_summary([s["latency_ms"] for s in samples if s["question_kind"] == kind])
+            for kind in question_mix
+        }
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "successful": len(ok),
+        "measured_s": round(measured_s, 3),
+        "throughput_rps": round(len(ok) / measured_s, 2) if measured_s > 0 else 0.0,
+        "error_rate": round((len(samples) - len(ok)) / len(samples), 4) if samples else 0.0,
+        "latency": latency_summary([s["latency_ms"] for s in samples]),
+        "operations": by_op,
+        "gemini_queue_wait": queue_wait,
+        "errors": errors,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def find_saturation(levels, min_gain=0.10):
+    """First concurrency level after which adding workers gains less than `min_gain` throughput"""
+    for previous, current in zip(levels, levels[1:]):
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain):
+            return previous["concurrency"]
+    return None
+
+
+def print_level(level):
+    lat = level["latency"]
+    print(f"\n  concurrency {level['concurrency']:>4}: {level['throughput_rps']} req/s, "
+          f"p50 {lat['p50_ms']}ms p95 {lat['p95_ms']}ms p99 {lat['p99_ms']}ms, "
+          f"errors {level['requests'] - level['successful']}/{level['requests']}")
+    for op, data in level["operations"].items():
+        for size, s in data["by_size"].items():
+            if s["count"]:
+                print(f"    {op:<10} {size:<8} n={s['count']:<6} p50 {s['p50_ms']}ms p95 {s['p95_ms']}ms p99 {s['p99_ms']}ms")
+    for name, s in level["gemini_queue_wait"].items():
+        print(f"    {name:<28} p50 {s['p50_ms']}ms p95 {s['p95_ms']}ms max {s['max_ms']}ms")
+    for error, n in sorted(level["errors"].items(), key=lambda e: -e[1]):
+        print(f"    error x{n}: {error}")
+
+
+def build_inprocess_targets(args, workdir):
+    prepare_environment(workdir, BUCKET, args.gemini_rpm, args.gemini_tpm, args.enable_caches)
+    s3 = LocalS3(os.path.join(workdir, "s3"))
+    gemini = FakeGeminiServer(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, seed=args.seed
+    ).start()
+    handlers = load_handlers(s3, gemini, os.path.join(workdir, "chromadb"))
+
+    targets = []
+    # Ingest without injected errors so every target document is queryable
+    error_rate, gemini.error_rate = gemini.error_rate, 0.0
+    for paragraphs in (int(p) for p in args.doc_sizes.split(",")):
+        corpus = generate_corpus(
+            s3, BUCKET, kinds=("txt",), docs_per_kind=args.docs_per_size,
+            paragraphs=paragraphs, questions_per_doc=0, seed=args.seed + paragraphs, name=f"load{paragraphs}"
+        )
+        for doc in corpus:
+            ingest_document(handlers, BUCKET, doc["file_key"])
+            targets.append({"file_key": doc["file_key"], "text": doc["text"], "size": f"{paragraphs}p"})
+    gemini.error_rate = error_rate
+
+    print(f"Ingested {len(targets)} documents ({args.doc_sizes} paragraphs each)")
+    return InProcessClient(handlers), targets, gemini
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for /qa and /summarize")
+    parser.add_argument("--mode", choices=("inprocess", "http"), default="inprocess")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL in http mode")
+    parser.add_argument("--file-keys", default="", help="Comma-separated, already ingested file keys (http mode)")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels to sweep")
+    parser.add_argument("--duration-s", type=float, default=10, help="Measured seconds per level")
+    parser.add_argument("--warmup-s", type=float, default=1, help="Unmeasured seconds before each level")
+    parser.add_argument("--op-mix", default="qa=0.9,summarize=0.1")
+    parser.add_argument("--question-mix", default="identifier=1,clause=1,open=1")
+    parser.add_argument("--doc-sizes", default="4,16,64", help="Paragraphs per document, one group per size (inprocess)")
+    parser.add_argument("--docs-per-size", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Fake Gemini latency (inprocess)")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake Gemini 429 rate (inprocess)")
+    parser.add_argument("--gemini-rpm", type=float, help="Scheduler requests/min (inprocess; default: unlimited)")
+    parser.add_argument("--gemini-tpm", type=float, help="Scheduler tokens/min (inprocess; default: unlimited)")
+    parser.add_argument("--enable-caches", action="store_true",
+                        help="Keep the summary/question-embedding caches on (inprocess; default: off)")
+    parser.add_argument("--timeout-s", type=float, default=60, help="Per-request timeout (http mode)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    op_mix = parse_weights(args.op_mix, ("qa", "summarize"))
+    question_mix = parse_weights(args.question_mix, QUESTION_KINDS)
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    with tempfile.TemporaryDirectory(prefix="anvita-load-") as workdir:
+        gemini = None
+        if args.mode == "inprocess":
+            client, targets, gemini = build_inprocess_targets(args, workdir)
+        else:
+            file_keys = [k for k in args.file_keys.split(",") if k]
+            if not file_keys:
+                raise SystemExit("--file-keys is required in http mode")
+            client = HttpClient(args.url, args.timeout_s)
+            print(HTTP_CACHE_NOTE)
+            # Without the document text, identifier/clause questions fall back to open questions
+            targets = [{"file_key": k, "text": [], "size": "remote"} for k in file_keys]
+
+        try:
+            results = []
+            for concurrency in levels:
+                level = run_level(client, targets, concurrency, args, op_mix, question_mix)
+                print_level(level)
+                results.append(level)
+        finally:
+            if gemini:
+                gemini.stop()
+
+    saturation = find_saturation(results)
+    if saturation:
+        print(f"\nThroughput stops scaling beyond concurrency {saturation}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "mode": args.mode,
+            "note": HTTP_CACHE_NOTE if args.mode == "http" else None,
+            "config": vars(args),
+            "saturation_concurrency": saturation,
+            "levels": results
+        }, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Local stand-ins for the services the handlers talk to, so the pipeline can run offline:
+
+- LocalS3: a directory-backed replacement for the boto3 S3 client
+- FakeGeminiServer: an HTTP server speaking the Gemini embedContent and
+  generateContent endpoints with configurable latency and error rate
+"""
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from botocore.exceptions import ClientError
+
+EMBEDDING_DIM = 768
+
+
+class _Body:
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, amt=None):
+        return self._stream.read() if amt is None else self._stream.read(amt)
+
+
+class _ListObjectsPaginator:
+    def __init__(self, s3):
+        self._s3 = s3
+
+    def paginate(self, Bucket, Prefix="", PaginationConfig=None):
+        page_size = (PaginationConfig or {}).get("PageSize", 1000)
+        token = None
+        while True:
+            kwargs = {"Bucket": Bucket, "Prefix": Prefix, "MaxKeys": page_size}
+            if token:
+                kwargs["ContinuationToken"] = token
+            page = self._s3.list_objects_v2(**kwargs)
+            yield page
+            if not page.get("IsTruncated"):
+                break
+            token = page["NextContinuationToken"]
+
+
+class LocalS3:
+    """Subset of the boto3 S3 client used by the handlers, backed by <root>/<bucket>/<key>"""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def _missing(self, operation, key):
+        return ClientError({"Error": {"Code": "NoSuchKey", "Message": f"No such key: {key}"}}, operation)
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, **kwargs):
+        data = Body.encode("utf-8") if isinstance(Body, str) else Body
+        if hasattr(data, "read"):
+            data = data.read()
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return {"ETag": hashlib.md5(data).hexdigest()}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        path = self._path(Bucket, Key)
+        if not os.path.isfile(path):
+            raise self._missing("GetObject", Key)
+        with open(path, "rb") as f:
+            data = f.read()
+        return {"Body": _Body(data), "ContentLength": len(data)}
+
+    def _etag(self, bucket, key):
+        with open(self._path(bucket, key), "rb") as f:
+            return '"' + hashlib.md5(f.read()).hexdigest() + '"'
+
+    def head_object(self, Bucket, Key, **kwargs):
+        path = self._path(Bucket, Key)
+        if not os.path.isfile(path):
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        return {"ContentLength": os.path.getsize(path), "ETag": self._etag(Bucket, Key)}
+
+    def download_fileobj(self, Bucket, Key, Fileobj, **kwargs):
+        path = self._path(Bucket, Key)
+        if not os.path.isfile(path):
+            raise self._missing("GetObject", Key)
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, Fileobj)
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, **kwargs):
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj.read())
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=None, **kwargs):
+        bucket_root = os.path.join(self.root, Bucket)
+        keys = []
+        for dirpath, _, filenames in os.walk(bucket_root):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                key = os.path.relpath(os.path.join(dirpath, filename), bucket_root).replace(os.sep, "/")
+                if key.startswith(Prefix):
+                    keys.append(key)
+        keys.sort()
+
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + MaxKeys]
+        response = {
+            "KeyCount": len(page),
+            "IsTruncated": start + MaxKeys < len(keys),
+            "Contents": [
+                {"Key": key, "Size": os.path.getsize(self._path(Bucket, key)), "ETag": self._etag(Bucket, key)}
+                for key in page
+            ]
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + MaxKeys)
+        return response
+
+    def get_paginator(self, operation_name):
+        if operation_name != "list_objects_v2":
+            raise NotImplementedError(operation_name)
+        return _ListObjectsPaginator(self)
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600):
+        return "file://" + self._path(Params["Bucket"], Params["Key"])
+
+
+def fake_embedding(text, dim=EMBEDDING_DIM):
+    """
+    Deterministic hashed bag-of-words embedding.
+    Texts sharing words end up close together, so retrieval stays meaningful offline.
+    """
+    vector = [0.0] * dim
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeGeminiServer:
+    """
+    Local Gemini API stand-in.
+    latency_ms/jitter_ms delay every response; error_rate is the fraction of requests answered with a 429.
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, host="127.0.0.1", port=0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1beta/models"
+
+    @property
+    def embed_url(self):
+        return f"{self.base_url}/gemini-embedding-001:embedContent"
+
+    @property
+    def generate_url(self):
+        return f"{self.base_url}/gemini-2.0-flash:generateContent"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _next_delay_and_error(self):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay / 1000.0, failed
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                delay, failed = server._next_delay_and_error()
+                time.sleep(delay)
+                if failed:
+                    self._reply(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}})
+                    return
+
+                path = self.path.split("?", 1)[0]
+                if path.endswith(":embedContent"):
+                    text = " ".join(p.get("text", "") for p in payload["content"]["parts"])
+                    self._reply(200, {"embedding": {"values": fake_embedding(text)}})
+                elif path.endswith(":generateContent"):
+                    prompt = " ".join(
+                        p.get("text", "") for c in payload.get("contents", []) for p in c.get("parts", [])
+                    )
+                    answer = f"[fake-gemini] {len(prompt)} prompt characters received."
+                    self._reply(200, {
+                        "candidates": [{"content": {"parts": [{"text": answer}]}}],
+                        "usageMetadata": {
+                            "promptTokenCount": len(prompt) // 4,
+                            "candidatesTokenCount": len(answer) // 4,
+                            "totalTokenCount": (len(prompt) + len(answer)) // 4
+                        }
+                    })
+                else:
+                    self._reply(404, {"error": {"code": 404, "message": f"Unknown path {path}"}})
+
+        return Handler
@@ -0,0 +1,230 @@
+"""
+Offline end-to-end pipeline benchmark.
+
+Runs the real extract_loader -> embedding_handler -> query_handler / summarizer
+handlers against a directory-backed S3 stand-in, a fake Gemini server and a
+throwaway Chroma store, over a synthetic corpus of PDFs, DOCX files, scanned
+pages and TXT files. Reports throughput, per-stage latency and peak RSS, and
+saves the results as JSON so runs on different commits can be compared.
+
+Usage:
+    python testing/benchmark/run_benchmark.py --docs-per-kind 5 --latency-ms 80
+    python testing/benchmark/run_benchmark.py --compare testing/benchmark/results/<previous>.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import KINDS, generate_corpus
+from harness import BACKEND_DIR, load_handlers, ocr_available, prepare_environment
+from local_stubs import FakeGeminiServer, LocalS3
+from stats import StageTimings, latency_summary, peak_rss_mb
+
+BUCKET = "anvita-benchmark"
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def call(handler, event):
+    """Invoke a handler, returning (latency_ms, status_code, body)"""
+    start = time.perf_counter()
+    response = handler.lambda_handler(event, None)
+    latency_ms = (time.perf_counter() - start) * 1000
+    return latency_ms, response["statusCode"], json.loads(response["body"])
+
+
+def run_phase(name, calls):
+    """
+    `calls` yields (handler, event) pairs. Returns the phase report including
+    latency percentiles, per-stage timings from the handlers' timing breakdown and RSS.
+    """
+    latencies, errors, stages = [], {}, StageTimings()
+    started = time.perf_counter()
+    for handler, event in calls:
+        latency_ms, status, body = call(handler, event)
+        latencies.append(latency_ms)
+        stages.add(body.get("timing"))
+        if status != 200:
+            key = f"{status}: {body.get('error', body.get('message', 'unknown'))}"[:120]
+            errors[key] = errors.get(key, 0) + 1
+    wall_s = time.perf_counter() - started
+    print(f"  {name}: {len(latencies)} calls in {wall_s:.2f}s")
+    return {
+        "wall_s": round(wall_s, 3),
+        "calls_per_s": round(len(latencies) / wall_s, 2) if wall_s else 0.0,
+        "latency": latency_summary(latencies),
+        "errors": errors,
+        "stages": stages.summary(),
+        "counters": stages.counters,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def run(args):
+    kinds = [k for k in args.kinds.split(",") if k]
+    if "scanned" in kinds and not ocr_available():
+        print("tesseract not found on PATH; skipping scanned documents")
+        kinds.remove("scanned")
+
+    with tempfile.TemporaryDirectory(prefix="anvita-bench-") as workdir:
+        prepare_environment(workdir, BUCKET, args.gemini_rpm, args.gemini_tpm, args.enable_caches)
+        s3 = LocalS3(os.path.join(workdir, "s3"))
+
+        gemini = FakeGeminiServer(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            seed=args.seed
+        )
+        with gemini:
+            handlers = load_handlers(s3, gemini, os.path.join(workdir, "chromadb"))
+
+            print(f"Generating corpus ({args.docs_per_kind} x {', '.join(kinds)})...")
+            corpus = generate_corpus(
+                s3, BUCKET, kinds=kinds, docs_per_kind=args.docs_per_kind,
+                paragraphs=args.paragraphs, questions_per_doc=args.questions, seed=args.seed
+            )
+            baseline_rss = peak_rss_mb()
+
+            print("Running phases:")
+            extract = run_phase("extract", (
+                (handlers["extract"], {"body": json.dumps({"bucket": BUCKET, "fileKey": doc["file_key"], "timing": True})})
+                for doc in corpus
+            ))
+
+            text_keys = [
+                doc["file_key"].replace("uploads/", "texts/").rsplit(".", 1)[0] + ".txt"
+                for doc in corpus
+            ]
+            embed = run_phase("embed", (
+                (handlers["embed"], {"bucket": BUCKET, "text_key": text_key, "file_key": doc["file_key"], "timing": True})
+                for doc, text_key in zip(corpus, text_keys)
+            ))
+            chunks = embed["counters"].get("chunks_ingested", 0)
+
+            query = run_phase("query", (
+                (handlers["query"], {"body": json.dumps({"file_key": doc["file_key"], "question": q, "timing": True})})
+                for doc in corpus for q in doc["questions"]
+            ))
+            summarize = run_phase("summarize", (
+                (handlers["summarize"], {"queryStringParameters": {"file_key": doc["file_key"], "timing": "true"}})
+                for doc in corpus
+            ))
+
+        ingest_s = extract["wall_s"] + embed["wall_s"]
+        total_bytes = sum(doc["size_bytes"] for doc in corpus)
+        return {
+            "revision": git_revision(),
+            "label": args.label,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {
+                "kinds": kinds,
+                "docs_per_kind": args.docs_per_kind,
+                "paragraphs": args.paragraphs,
+                "questions_per_doc": args.questions,
+                "gemini_latency_ms": args.latency_ms,
+                "gemini_jitter_ms": args.jitter_ms,
+                "gemini_error_rate": args.error_rate,
+                "gemini_rpm": args.gemini_rpm,
+                "gemini_tpm": args.gemini_tpm,
+                "caches": args.enable_caches,
+                "seed": args.seed
+            },
+            "corpus": {"documents": len(corpus), "bytes": total_bytes, "chunks": chunks},
+            "throughput": {
+                "ingest_docs_per_s": round(len(corpus) / ingest_s, 2) if ingest_s else 0.0,
+                "ingest_chunks_per_s": round(chunks / ingest_s, 2) if ingest_s else 0.0,
+                "ingest_mb_per_s": round(total_bytes / (1024 * 1024) / ingest_s, 3) if ingest_s else 0.0,
+                "queries_per_s": query["calls_per_s"],
+                "summaries_per_s": summarize["calls_per_s"]
+            },
+            "phases": {"extract": extract, "embed": embed, "query": query, "summarize": summarize},
+            "gemini": {"requests": gemini.requests, "injected_errors": gemini.errors},
+            "memory": {"after_corpus_rss_mb": baseline_rss, "peak_rss_mb": peak_rss_mb()}
+        }
+
+
+def print_report(result):
+    print(f"\n=== Benchmark @ {result['revision']} ({result['corpus']['documents']} docs, "
+          f"{result['corpus']['chunks']} chunks) ===")
+    for name, value in result["throughput"].items():
+        print(f"  {name:<22} {value}")
+    for phase, data in result["phases"].items():
+        lat = data["latency"]
+        errors = sum(data["errors"].values())
+        print(f"\n  [{phase}] p50 {lat['p50_ms']}ms  p95 {lat['p95_ms']}ms  max {lat['max_ms']}ms  errors {errors}")
+        for stage, s in data["stages"].items():
+            print(f"    {stage:<18} calls {s['calls']:<6} total {s['total_ms']:>10.1f}ms  p95/invocation {s['p95_ms']}ms")
+    print(f"\n  peak RSS {result['memory']['peak_rss_mb']} MB")
+
+
+def print_comparison(previous, current):
+    """Relative change of the headline numbers against an earlier results file"""
+    def delta(old, new):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"\n=== {previous['revision']} -> {current['revision']} ===")
+    for name, new in current["throughput"].items():
+        old = previous["throughput"].get(name, 0)
+        print(f"  {name:<22} {old:>10} -> {new:<10} {delta(old, new)}")
+    for phase, data in current["phases"].items():
+        old = previous["phases"].get(phase, {}).get("latency", {})
+        for key in ("p50_ms", "p95_ms"):
+            print(f"  {phase + ' ' + key:<22} {old.get(key, 0):>10} -> {data['latency'][key]:<10} "
+                  f"{delta(old.get(key, 0), data['latency'][key])}")
+    old_rss = previous["memory"]["peak_rss_mb"]
+    new_rss = current["memory"]["peak_rss_mb"]
+    print(f"  {'peak_rss_mb':<22} {old_rss:>10} -> {new_rss:<10} {delta(old_rss, new_rss)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Anvita pipeline benchmark")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="Comma-separated subset of pdf,docx,scanned,txt")
+    parser.add_argument("--docs-per-kind", type=int, default=3)
+    parser.add_argument("--paragraphs", type=int, default=12, help="Paragraphs per document (~120 words each)")
+    parser.add_argument("--questions", type=int, default=5, help="Questions asked per document")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Fake Gemini response latency")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of Gemini calls answered with 429")
+    parser.add_argument("--gemini-rpm", type=float, help="Scheduler requests/min (default: unlimited)")
+    parser.add_argument("--gemini-tpm", type=float, help="Scheduler tokens/min (default: unlimited)")
+    parser.add_argument("--enable-caches", action="store_true",
+                        help="Keep the summary/question-embedding caches on (default: off)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="", help="Free-form note stored with the results")
+    parser.add_argument("--output", help="Results file (default: results/<timestamp>_<revision>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    result = run(args)
+    print_report(result)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{result['revision']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
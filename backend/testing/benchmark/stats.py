@@ -0,0 +1,53 @@
+"""Latency/throughput helpers shared by the benchmark and load-test scripts"""
+import math
+import resource
+import sys
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile; returns 0.0 for an empty list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(latencies_ms):
+    return {
+        "count": len(latencies_ms),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+        "max_ms": round(max(latencies_ms), 2) if latencies_ms else 0.0
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+class StageTimings:
+    """Aggregates the "timing" breakdowns returned by instrumented handlers"""
+
+    def __init__(self):
+        self.per_call = {}
+        self.calls = {}
+        self.counters = {}
+
+    def add(self, timing):
+        for name, span in (timing or {}).get("spans", {}).items():
+            self.per_call.setdefault(name, []).append(span["total_ms"])
+            self.calls[name] = self.calls.get(name, 0) + span["count"]
+        for name, value in (timing or {}).get("counters", {}).items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        return {
+            name: dict(latency_summary(values), total_ms=round(sum(values), 2), calls=self.calls[name])
+            for name, values in sorted(self.per_call.items())
+        }
@@ -0,0 +1,10 @@
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _module_dir in ("shared", "bulk_ingest"):
+    sys.path.append(os.path.join(BACKEND_DIR, "src", _module_dir))
+
+# Keep EMF log lines out of test output
+os.environ.setdefault("METRICS_ENABLED", "false")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+import bulk_ingest
+from bulk_ingest import Checkpoint, plan_object
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    return str(tmp_path / "run.checkpoint.jsonl")
+
+
+def test_checkpoint_survives_a_restart_and_a_torn_last_line(checkpoint_path):
+    checkpoint = Checkpoint(checkpoint_path)
+    checkpoint.record({"file_key": "uploads/a.pdf", "etag": "e1", "status": "ingested"})
+    checkpoint.record({"file_key": "uploads/b.pdf", "etag": "e2", "status": "failed", "error": "boom"})
+    checkpoint.close()
+    with open(checkpoint_path, "a") as f:
+        f.write('{"file_key": "uploads/c.pdf", "et')
+
+    resumed = Checkpoint(checkpoint_path)
+    try:
+        assert resumed.is_done("uploads/a.pdf", "e1")
+        assert not resumed.is_done("uploads/b.pdf", "e2")
+        assert "uploads/c.pdf" not in resumed.entries
+    finally:
+        resumed.close()
+
+
+def test_later_entries_win_on_resume(checkpoint_path):
+    checkpoint = Checkpoint(checkpoint_path)
+    checkpoint.record({"file_key": "uploads/a.pdf", "etag": "e1", "status": "failed", "error": "429"})
+    checkpoint.record({"file_key": "uploads/a.pdf", "etag": "e1", "status": "ingested"})
+    checkpoint.close()
+
+    resumed = Checkpoint(checkpoint_path)
+    try:
+        assert resumed.is_done("uploads/a.pdf", "e1")
+    finally:
+        resumed.close()
+
+
+@pytest.mark.parametrize("history, etag, reingest, expected", [
+    ([], "e1", False, "new"),
+    ([("ingested", "e1")], "e1", False, "skip"),
+    ([("existing", "e1")], "e1", False, "skip"),
+    # The object changed since it was ingested: the old chunks must go
+    ([("ingested", "e1")], "e2", False, "replace"),
+    # A failed replace must not fall back to "new", where the old chunks would count as ingested
+    ([("ingested", "e1"), ("failed", "e2")], "e2", False, "replace"),
+    ([("failed", "e1")], "e1", False, "replace"),
+    ([("ingested", "e1")], "e1", True, "replace"),
+])
+def test_plan_object(checkpoint_path, history, etag, reingest, expected):
+    checkpoint = Checkpoint(checkpoint_path)
+    try:
+        for status, recorded_etag in history:
+            checkpoint.record({"file_key": "uploads/a.pdf", "etag": recorded_etag, "status": status})
+        assert plan_object(checkpoint, "uploads/a.pdf", etag, reingest) == expected
+    finally:
+        checkpoint.close()
+
+
+def test_failed_replace_is_retried_as_a_replace_after_restart(checkpoint_path):
+    checkpoint = Checkpoint(checkpoint_path)
+    checkpoint.record({"file_key": "uploads/a.pdf", "etag": "e1", "status": "ingested"})
+    checkpoint.record({"file_key": "uploads/a.pdf", "etag": "e2", "status": "failed", "error": "429"})
+    checkpoint.close()
+
+    resumed = Checkpoint(checkpoint_path)
+    try:
+        assert plan_object(resumed, "uploads/a.pdf", "e2") == "replace"
+    finally:
+        resumed.close()
+
+
+def test_records_are_flushed_as_json_lines(checkpoint_path):
+    checkpoint = Checkpoint(checkpoint_path)
+    checkpoint.record({"file_key": "uploads/a.pdf", "etag": "e1", "status": "ingested"})
+    with open(checkpoint_path) as f:
+        assert [json.loads(line)["file_key"] for line in f] == ["uploads/a.pdf"]
+    checkpoint.close()
+
+
+def test_workers_split_the_quota_without_a_shared_table(monkeypatch):
+    monkeypatch.setattr(bulk_ingest.gemini_scheduler, "SCHEDULER_TABLE", None)
+    monkeypatch.setattr(bulk_ingest.gemini_scheduler, "GEMINI_RPM", 1500.0)
+    monkeypatch.setattr(bulk_ingest.gemini_scheduler, "GEMINI_TPM", 1_000_000.0)
+    previous = bulk_ingest.gemini_scheduler.get_scheduler()
+    try:
+        bulk_ingest._init_worker(None, 4)
+        scheduler = bulk_ingest.gemini_scheduler.get_scheduler()
+        assert scheduler.requests_per_min == 375
+        assert scheduler.tokens_per_min == 250_000
+    finally:
+        bulk_ingest.gemini_scheduler.set_scheduler(previous)
@@ -0,0 +1,138 @@
+from types import SimpleNamespace
+
+import pytest
+
+import gemini_scheduler
+from gemini_scheduler import BACKGROUND, INTERACTIVE, GeminiScheduler, InMemoryStore, RateLimitTimeout
+from instrumentation import instrumented
+
+
+class FakeClock:
+    """Injectable clock/sleep pair: sleeping advances time instead of blocking"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_scheduler(clock, requests_per_min=10, tokens_per_min=1_000_000, background_reserve=0.2, store=None):
+    return GeminiScheduler(
+        store or InMemoryStore(), requests_per_min=requests_per_min, tokens_per_min=tokens_per_min,
+        background_reserve=background_reserve, clock=clock, sleep=clock.sleep
+    )
+
+
+def test_interactive_lane_drains_the_whole_bucket():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+
+    for _ in range(10):
+        scheduler.acquire(INTERACTIVE, 1)
+    assert clock.sleeps == []
+
+    # The 11th request waits for the refill (10/min -> one every 6s)
+    queue_wait = scheduler.acquire(INTERACTIVE, 1)
+    assert clock.sleeps
+    assert queue_wait == pytest.approx(sum(clock.sleeps))
+
+
+def test_background_lane_leaves_the_reserve_for_interactive():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+
+    # 20% of 10 requests stays untouched by background work
+    for _ in range(8):
+        scheduler.acquire(BACKGROUND, 1)
+    assert clock.sleeps == []
+    assert scheduler._try_acquire(BACKGROUND, 1) > 0
+
+    for _ in range(2):
+        scheduler.acquire(INTERACTIVE, 1)
+    assert clock.sleeps == []
+
+
+def test_background_lane_honours_the_token_reserve():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, requests_per_min=1000, tokens_per_min=1000)
+
+    scheduler.acquire(BACKGROUND, 700)
+    assert scheduler._try_acquire(BACKGROUND, 200) > 0
+    # Interactive calls may use the reserved tokens
+    scheduler.acquire(INTERACTIVE, 200)
+    assert clock.sleeps == []
+
+
+def test_times_out_when_the_wait_exceeds_the_lane_limit():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, requests_per_min=1)
+    scheduler.acquire(INTERACTIVE, 1)
+
+    # The next slot is 60s away, beyond the interactive lane's 20s limit
+    with pytest.raises(RateLimitTimeout):
+        scheduler.acquire(INTERACTIVE, 1)
+    assert clock.sleeps == []
+
+
+def test_short_waits_add_up_to_a_timeout(monkeypatch):
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    monkeypatch.setattr(gemini_scheduler, "MAX_WAIT_S", {INTERACTIVE: 20.0, BACKGROUND: 2.0})
+    # An interactive caller keeps waiting, so background work steps aside in 50ms slices
+    scheduler._interactive_waiting = 1
+
+    with pytest.raises(RateLimitTimeout):
+        scheduler.acquire(BACKGROUND, 1)
+    assert len(clock.sleeps) > 10
+    # Gives up once the next 50ms slice (up to 60ms with jitter) would pass the 2s limit
+    assert 1.95 < sum(clock.sleeps) <= 2.01
+
+
+def test_wait_is_capped_at_the_function_deadline(monkeypatch):
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, requests_per_min=60)
+    for _ in range(60):
+        scheduler.acquire(INTERACTIVE, 1)
+    monkeypatch.setattr(gemini_scheduler, "DEADLINE_MARGIN_S", 5.0)
+
+    @instrumented("test_handler")
+    def handler(event, context):
+        try:
+            scheduler.acquire(BACKGROUND, 1)
+        except RateLimitTimeout as e:
+            return {"statusCode": 429, "body": str(e)}
+        return {"statusCode": 200, "body": ""}
+
+    # 6s left minus the 5s margin leaves 1s, far short of the ~13s background wait
+    # that is within the lane's own 300s limit
+    context = SimpleNamespace(aws_request_id="test", get_remaining_time_in_millis=lambda: 6000)
+    assert handler({}, context)["statusCode"] == 429
+
+
+def test_lost_compare_and_set_backs_off_before_retrying():
+    class ConflictingStore(InMemoryStore):
+        conflicts = 2
+
+        def compare_and_set(self, key, state, expected_version):
+            if self.conflicts:
+                self.conflicts -= 1
+                return False
+            return super().compare_and_set(key, state, expected_version)
+
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, store=ConflictingStore())
+    scheduler.acquire(INTERACTIVE, 1)
+
+    assert len(clock.sleeps) == 2
+    assert all(0 < s <= gemini_scheduler.CONFLICT_BACKOFF_S for s in clock.sleeps)
+
+
+def test_unknown_lane_is_rejected():
+    with pytest.raises(ValueError):
+        make_scheduler(FakeClock()).acquire("batch", 1)
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+import instrumentation
+from instrumentation import Trace, count, instrumented, span, timing_requested
+
+
+@pytest.mark.parametrize("event", [
+    {"queryStringParameters": {"timing": "true"}},
+    {"headers": {"X-Anvita-Timing": "1"}},
+    {"body": json.dumps({"question": "q", "timing": True})},
+    {"timing": "yes"},
+])
+def test_timing_requested(event):
+    assert timing_requested(event)
+
+
+@pytest.mark.parametrize("event", [
+    {},
+    {"queryStringParameters": None, "headers": None, "body": None},
+    {"queryStringParameters": {"timing": "false"}},
+    {"body": "not json"},
+    {"body": json.dumps(["timing"])},
+    None,
+])
+def test_timing_not_requested(event):
+    assert not timing_requested(event)
+
+
+@instrumented("test_handler")
+def handler(event, context):
+    with span("work"):
+        count("items", 3)
+    return {"statusCode": 200, "body": json.dumps({"answer": 42})}
+
+
+def test_instrumented_adds_timing_only_when_requested():
+    plain = json.loads(handler({"body": "{}"}, None)["body"])
+    assert plain == {"answer": 42}
+
+    timed = json.loads(handler({"body": json.dumps({"timing": True})}, None)["body"])
+    assert timed["answer"] == 42
+    assert timed["timing"]["spans"]["work"]["count"] == 1
+    assert timed["timing"]["counters"] == {"items": 3}
+    assert "container" in timed["timing"]["caches"]
+
+
+def test_instrumented_leaves_non_json_bodies_alone():
+    @instrumented("text_handler")
+    def text_handler(event, context):
+        return {"statusCode": 200, "body": "plain text"}
+
+    assert text_handler({"timing": True}, None)["body"] == "plain text"
+
+
+def test_instrumented_emits_one_record_per_invocation(monkeypatch):
+    emitted = []
+    monkeypatch.setattr(instrumentation, "emit", lambda trace, status_code=None: emitted.append(status_code))
+    handler({}, None)
+    assert emitted == [200]
+
+
+def test_to_emf_declares_one_metric_per_span_counter_and_cache():
+    trace = Trace("query_handler", request_id="req-1")
+    trace.add_span("chroma_query", 12.5)
+    trace.add_span("chroma_query", 7.5)
+    trace.count("chunks_retrieved", 5)
+    trace.count("s3_download_bytes", 2048, "Bytes")
+    trace.cache_access("summary", True)
+    trace.cache_access("summary", False)
+
+    record = trace.to_emf(status_code=200)
+    directive = record["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == instrumentation.METRICS_NAMESPACE
+    assert directive["Dimensions"] == [["Handler"]]
+
+    units = {m["Name"]: m["Unit"] for m in directive["Metrics"]}
+    assert units == {
+        "duration_ms": "Milliseconds",
+        "chroma_query_ms": "Milliseconds",
+        "chunks_retrieved": "Count",
+        "s3_download_bytes": "Bytes",
+        "summary_cache_hit_rate": "Percent",
+    }
+    assert len(directive["Metrics"]) == len(units)
+
+    assert record["Handler"] == "query_handler"
+    assert record["RequestId"] == "req-1"
+    assert record["StatusCode"] == 200
+    assert record["chroma_query_ms"] == 20.0
+    assert record["chroma_query_calls"] == 2
+    assert record["chunks_retrieved"] == 5
+    assert record["summary_cache_hit_rate"] == 50.0
+    # Every declared metric has a value in the record
+    assert all(name in record for name in units)
+
+
+def test_code_outside_a_handler_records_nothing():
+    with span("orphan"):
+        count("orphan_items")
+    assert instrumentation.current_trace().spans == {}
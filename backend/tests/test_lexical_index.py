@@ -0,0 +1,89 @@
+import pytest
+
+import lexical_index
+
+CHUNKS = [
+    "Section 4 lists the 2 items delivered: pumps and valves.",
+    "Invoice INV-10234 covers clause 4.2 of the supply agreement.",
+    "Payment is due within thirty days of delivery.",
+    "The warranty excludes damage caused by misuse.",
+]
+
+
+@pytest.fixture
+def index():
+    return lexical_index.build_index("doc", CHUNKS)
+
+
+def test_tokenize_keeps_compound_identifiers_and_their_parts():
+    tokens = lexical_index.tokenize("What does INV-10234 say?")
+    assert tokens == ["inv-10234", "inv", "10234"]
+
+
+@pytest.mark.parametrize("token, expected", [
+    ("inv-10234", True),
+    ("4.2", True),
+    ("a7", True),
+    ("2", False),
+    ("10234", False),
+    ("follow-up", False),
+    ("pumps", False),
+])
+def test_is_identifier(token, expected):
+    assert lexical_index.is_identifier(token) is expected
+
+
+def test_search_ranks_the_chunk_with_the_identifier_first(index):
+    hits = lexical_index.search(index, "invoice INV-10234")
+    assert hits[0][0] == 1
+    assert all(a[1] >= b[1] for a, b in zip(hits, hits[1:]))
+
+
+def test_search_on_an_empty_document_returns_nothing():
+    assert lexical_index.search(lexical_index.build_index("empty", []), "anything") == []
+
+
+def test_is_confident_for_an_unambiguous_identifier(index):
+    question = "What does invoice INV-10234 cover?"
+    hits = lexical_index.search(index, question)
+    assert lexical_index.is_confident(index, question, hits, min_margin=1.5)
+
+
+def test_bare_numbers_are_not_identifiers_for_the_fast_path(index):
+    question = "What are the 2 items in section 4?"
+    hits = lexical_index.search(index, question)
+    assert hits and hits[0][0] == 0
+    assert not lexical_index.is_confident(index, question, hits, min_margin=1.5)
+
+
+def test_open_questions_never_qualify(index):
+    question = "When is payment due after delivery?"
+    hits = lexical_index.search(index, question)
+    assert not lexical_index.is_confident(index, question, hits, min_margin=1.0)
+
+
+def test_is_confident_requires_the_margin_over_the_runner_up(index):
+    question = "What does invoice INV-10234 say about delivery?"
+    hits = lexical_index.search(index, question)
+    assert len(hits) > 1
+    assert lexical_index.is_confident(index, question, hits, min_margin=1.0)
+    assert not lexical_index.is_confident(index, question, hits, min_margin=1000)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = lexical_index.reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]])
+    assert [item for item, _ in fused] == ["b", "a", "d", "c"]
+
+
+def test_store_round_trip_and_reload_after_rewrite(tmp_path, index):
+    store = lexical_index.LexicalIndexStore(str(tmp_path))
+    assert store.load("uploads/a.pdf") is None
+
+    store.save("uploads/a.pdf", index)
+    assert store.load("uploads/a.pdf")["doc_id"] == "doc"
+
+    # Another process re-ingesting the document is picked up despite the cache
+    lexical_index.LexicalIndexStore(str(tmp_path)).save(
+        "uploads/a.pdf", lexical_index.build_index("doc2", CHUNKS[:1])
+    )
+    assert store.load("uploads/a.pdf")["doc_id"] == "doc2"